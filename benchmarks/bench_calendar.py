@@ -0,0 +1,79 @@
+""" Benchmark building calendar events, row loop against the column-wise builder
+
+Run from the repository root: python -m benchmarks.bench_calendar [rows]
+"""
+
+import sys
+import time
+import datetime
+import pandas as pd
+from utils.data import _prepare, DATASET_COLUMNS
+from utils.events import build_calendar_events, window_events, _records, STATUS_COLORS
+from benchmarks.synthetic import synthetic_pm_data
+
+def baseline_calendar_events(data):
+    """ Row-by-row event building as implemented before vectorization """
+
+    events = []
+
+    if data.empty:
+        return events
+
+    valid_data = data[data['Notification date'].notna()].copy()
+
+    for idx, row in valid_data.iterrows():
+        try:
+            event_date = pd.to_datetime(row['Notification date'])
+            status = row.get('Work Order Status', 'Unknown')
+            color = STATUS_COLORS.get(status, '#808080')
+
+            notification_type = row.get('Notification type', 'Work Order')
+            station = row.get('StationList', 'N/A')
+
+            event = {
+                'title': f"{notification_type} - {station}",
+                'start': event_date.strftime('%Y-%m-%d'),
+                'end': event_date.strftime('%Y-%m-%d'),
+                'id': f"event_{idx}",
+                'backgroundColor': color,
+                'borderColor': color,
+            }
+            events.append(event)
+        except Exception:
+            continue
+
+    return events
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = _prepare(synthetic_pm_data(rows)[DATASET_COLUMNS])
+    print(f"Synthetic dataset: {rows} rows")
+
+    start = time.perf_counter()
+    baseline = baseline_calendar_events(df)
+    baseline_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    events = _records(build_calendar_events(df))
+    build_time = time.perf_counter() - start
+
+    # One month view with the page's margin, rows sorted by date like the shared dataset
+    sorted_df = df.sort_values('Notification date', kind='stable', na_position='last')
+    start = time.perf_counter()
+    window = window_events(sorted_df, datetime.date(2022, 5, 18), datetime.date(2022, 7, 14))
+    window_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    window_events(sorted_df, datetime.date(2022, 5, 18), datetime.date(2022, 7, 14), version=0)
+    window_events(sorted_df, datetime.date(2022, 5, 18), datetime.date(2022, 7, 14), version=0)
+    cached_time = time.perf_counter() - start
+
+    assert events == baseline
+    print(f"{'row loop':22}{baseline_time * 1000:>12.1f} ms")
+    print(f"{'column-wise':22}{build_time * 1000:>12.1f} ms{baseline_time / build_time:>8.1f}x")
+    print(f"{'visible window':22}{window_time * 1000:>12.1f} ms{baseline_time / window_time:>8.1f}x"
+          f" ({len(window)} of {len(events)} events)")
+    print(f"{'window per version':22}{cached_time * 1000:>12.1f} ms (first build and one cache hit)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+""" Benchmark dashboard chart figures, Plotly Express on every run against the figure cache
+
+Run from the repository root: python -m benchmarks.bench_charts [rows]
+"""
+
+import sys
+import time
+import datetime
+import plotly.express as px
+import plotly.io as pio
+from utils.data import _prepare
+from utils.db import COLUMN_MAPPING, ROLLUP_COLUMNS
+from utils.charts import volume_trend, staff_activity, chart_figure, trend_period
+from benchmarks.synthetic import synthetic_pm_data
+
+FILTERS = {
+    'date_range': (datetime.date(2020, 1, 1), datetime.date(2024, 12, 31)),
+    'status': ['All'],
+    'stations': ['All'],
+    'types': ['All'],
+    'staff': ['All']
+}
+
+def synthetic_rollup(rows):
+    """ Daily rollup of a synthetic dataset, grouped like the PM_rollup table """
+
+    df = synthetic_pm_data(rows)
+    dims = [COLUMN_MAPPING.get(column, column) for column in ROLLUP_COLUMNS]
+    df['Notification date'] = df['Notification date'].str[:10] + ' 00:00:00'
+    rollup = df.groupby(['Notification date'] + dims, dropna=False).agg(
+        Orders=('ID', 'size'),
+        MTTR_sum=('MTTR', 'sum'),
+        Duration_sum=('Activity Duration', 'sum')
+    ).reset_index()
+    return _prepare(rollup).sort_values('Notification date', kind='stable').reset_index(drop=True)
+
+def trend_figure(trend, period):
+    """ Trend bars as drawn by the dashboard """
+
+    return px.bar(trend, x=period, y='Count', color='Notification type')
+
+def staff_figure(staff):
+    """ Staff activity bars as drawn by the dashboard """
+
+    return px.bar(staff, x='Activity by 1', y='Count', color='Activity Type')
+
+def timed(func, repeat=5):
+    """ Best wall time of several runs """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rollup = synthetic_rollup(rows)
+    print(f"Synthetic dataset: {rows} rows, {len(rollup)} rollup rows, 5 years")
+    print(f"{'chart':32}{'bars':>7}{'JSON (KB)':>11}{'figure (ms)':>13}")
+
+    weekly = volume_trend(rollup, FILTERS, 'Week')
+    period = trend_period(FILTERS['date_range'])
+    binned = volume_trend(rollup, FILTERS, period)
+    all_staff = staff_activity(rollup, FILTERS, limit=sys.maxsize)
+    top_staff = staff_activity(rollup, FILTERS)
+
+    cases = [
+        ('trend, weekly bins', lambda: trend_figure(weekly, 'Week'), len(weekly)),
+        (f'trend, {period.lower()}ly bins', lambda: trend_figure(binned, period), len(binned)),
+        ('staff activity, all staff', lambda: staff_figure(all_staff), len(all_staff)),
+        ('staff activity, busiest staff', lambda: staff_figure(top_staff), len(top_staff))
+    ]
+    for label, build, bars in cases:
+        spec, build_time = timed(lambda: pio.to_json(build(), validate=False))
+        print(f"{label:32}{bars:>7}{len(spec) / 1024:>11.1f}{build_time * 1000:>13.1f}")
+
+    # Figure cache hits rebuild the figure from its JSON instead of running Plotly Express
+    chart_figure('trend', FILTERS, lambda: trend_figure(binned, period), version=0)
+    _, cached_time = timed(lambda: pio.to_json(
+        chart_figure('trend', FILTERS, lambda: trend_figure(binned, period), version=0), validate=False
+    ))
+    print(f"{f'trend, {period.lower()}ly, cached':32}{len(binned):>7}{'':>11}{cached_time * 1000:>13.1f}")
+
+if __name__ == '__main__':
+    main()
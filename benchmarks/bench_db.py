@@ -0,0 +1,68 @@
+""" Benchmark dashboard reads while an import is running, rollback journal against WAL with pooled readers
+
+Run from the repository root: python -m benchmarks.bench_db [rows]
+"""
+
+import io
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+import numpy as np
+from utils import db
+from benchmarks.synthetic import synthetic_pm_data
+
+def baseline_data_version():
+    """ Data version read on a new connection as implemented before the pool """
+
+    conn = sqlite3.connect(db.DB_PATH)
+    try:
+        row = conn.execute(f"SELECT value FROM {db.META_TABLE} WHERE key = 'data_version'").fetchone()
+        version = row[0] if row else 0
+    except:
+        version = 0
+    conn.close()
+    return version
+
+def reads_during_import(csv, read, journal_mode):
+    """ Read the data version in a loop while the CSV is imported, return latencies and failed reads """
+
+    with db.write_connection() as conn:
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+
+    latencies = []
+    failed = 0
+    worker = threading.Thread(target=db.import_csv, args=(io.BytesIO(csv),))
+    worker.start()
+    while worker.is_alive():
+        start = time.perf_counter()
+        # The version only goes up, 0 means the read failed
+        failed += read() == 0
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    worker.join()
+    return np.array(latencies) * 1000, failed
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    db_names = {name: column for column, name in db.COLUMN_MAPPING.items()}
+    csv = synthetic_pm_data(rows).rename(columns=db_names).to_csv(index=False).encode()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db.DB_PATH = os.path.join(directory, 'bench.db')
+        db.init_db()
+        db.import_csv(io.BytesIO(csv))
+        print(f"Synthetic dataset: {rows} rows, data version read while the same file is imported again")
+        print(f"{'journal / reads':32}{'reads':>7}{'failed':>8}{'p50 (ms)':>10}{'max (ms)':>10}")
+
+        for label, read, journal_mode in [
+            ('rollback journal, new connection', baseline_data_version, 'DELETE'),
+            ('WAL, pooled connection', db.data_version, 'WAL')
+        ]:
+            latencies, failed = reads_during_import(csv, read, journal_mode)
+            print(f"{label:32}{len(latencies):>7}{failed:>8}{np.median(latencies):>10.2f}{latencies.max():>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+""" Benchmark dashboard filtering for every filter combination
+
+Run from the repository root: python -m benchmarks.bench_filters [rows]
+"""
+
+import sys
+import time
+import itertools
+import datetime
+import pandas as pd
+from utils.data import _prepare, DATASET_COLUMNS
+from utils.filters import filter_index
+from benchmarks.synthetic import synthetic_pm_data
+
+ACTIVE_FILTERS = {
+    'date_range': (datetime.date(2022, 1, 1), datetime.date(2022, 12, 31)),
+    'status': ['Completed', 'Open'],
+    'stations': [f'Station {i}' for i in range(5)],
+    'types': ['Breakdown'],
+    'staff': [f'Technician {i}' for i in range(5)]
+}
+
+def baseline_apply_filters(df, filters):
+    """ Copy-and-slice filtering as implemented before the mask engine """
+
+    filtered_df = df.copy()
+
+    if filters['date_range'] and len(filters['date_range']) == 2:
+        filtered_df['Notification date'] = pd.to_datetime(filtered_df['Notification date'], errors='coerce')
+
+        start_date = pd.Timestamp(filters['date_range'][0])
+        end_date = pd.Timestamp(filters['date_range'][1]) + pd.Timedelta(days=1)
+
+        filtered_df = filtered_df[
+            (filtered_df['Notification date'].notna()) &
+            (filtered_df['Notification date'] >= start_date) &
+            (filtered_df['Notification date'] < end_date)
+        ]
+
+    if 'All' not in filters['status'] and filters['status']:
+        filtered_df = filtered_df[filtered_df['Work Order Status'].isin(filters['status'])]
+    if 'All' not in filters['stations'] and filters['stations']:
+        filtered_df = filtered_df[filtered_df['StationList'].isin(filters['stations'])]
+    if 'All' not in filters['types'] and filters['types']:
+        filtered_df = filtered_df[filtered_df['Notification type'].isin(filters['types'])]
+    if 'All' not in filters['staff'] and filters['staff']:
+        filtered_df = filtered_df[filtered_df['Activity by 1'].isin(filters['staff'])]
+
+    return filtered_df
+
+def timed(func, *args, repeat=3):
+    """ Best wall time of several runs """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = _prepare(synthetic_pm_data(rows)[DATASET_COLUMNS])
+    sorted_df = df.sort_values('Notification date', kind='stable', na_position='last')
+    print(f"Synthetic dataset: {rows} rows")
+    print(f"{'active filters':44}{'rows':>10}{'baseline (ms)':>15}{'mask (ms)':>12}{'sorted (ms)':>13}{'speedup':>9}")
+
+    total_baseline = total_mask = total_sorted = 0.0
+    for active in itertools.product([False, True], repeat=len(ACTIVE_FILTERS)):
+        filters = {
+            key: value if on else (None if key == 'date_range' else ['All'])
+            for (key, value), on in zip(ACTIVE_FILTERS.items(), active)
+        }
+        baseline, baseline_time = timed(baseline_apply_filters, df, filters)
+        positions, mask_time = timed(filter_index, df, filters)
+        sorted_positions, sorted_time = timed(filter_index, sorted_df, filters, True)
+        assert len(baseline) == len(positions) == len(sorted_positions)
+        assert set(baseline.index) == set(sorted_df.index[sorted_positions])
+
+        total_baseline += baseline_time
+        total_mask += mask_time
+        total_sorted += sorted_time
+        label = ', '.join(key for key, on in zip(ACTIVE_FILTERS, active) if on) or 'none'
+        print(f"{label:44}{len(positions):>10}{baseline_time * 1000:>15.1f}{mask_time * 1000:>12.1f}"
+              f"{sorted_time * 1000:>13.1f}{baseline_time / sorted_time:>8.1f}x")
+
+    print(f"{'total':44}{'':>10}{total_baseline * 1000:>15.1f}{total_mask * 1000:>12.1f}"
+          f"{total_sorted * 1000:>13.1f}{total_baseline / total_sorted:>8.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+""" Benchmark preprocessing of a synthetic PM_data table
+
+Run from the repository root: python -m benchmarks.bench_preprocess [rows]
+"""
+
+import sys
+import time
+import pandas as pd
+from utils.data import _prepare
+from utils.db import DB_DATE_FORMAT
+from benchmarks.synthetic import synthetic_pm_data
+
+def baseline_prepare(df):
+    """ Row-wise preprocessing as implemented before vectorization """
+
+    columns = [
+        'Notification date',
+        'Malfunction Start Date',
+        'Malfunction Stop Date',
+        'Activity Start Date',
+        'Activity Stop Date'
+        ]
+    df[columns] = df[columns].apply(pd.to_datetime, format=DB_DATE_FORMAT, errors='coerce')
+
+    columns = [
+        'StationList',
+        'MachineList',
+        'Equipment Part',
+        'Problem type',
+        'Activity by 1'
+        ]
+    df[columns] = df[columns].fillna('Unknown')
+    df['Activity by 1'] = df['Activity by 1'].astype(str).apply(lambda x: ' '.join(x.split()))
+
+    num_columns = [
+        'MTTR',
+        'Activity Duration',
+        'Breakdown Hour',
+        'ActivityCount'
+        ]
+    df[num_columns] = df[num_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+    return df
+
+def measure(func, df):
+    """ Time a preprocessing function and measure the resulting memory """
+
+    start = time.perf_counter()
+    result = func(df.copy())
+    elapsed = time.perf_counter() - start
+    return result, elapsed, result.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df = synthetic_pm_data(rows)
+    print(f"Synthetic PM_data: {rows} rows, {len(df.columns)} columns")
+
+    baseline, baseline_time, baseline_mem = measure(baseline_prepare, df)
+    prepared, prepared_time, prepared_mem = measure(_prepare, df)
+
+    # Both pipelines must produce the same values, compared on a sample to keep the check fast
+    pd.testing.assert_frame_equal(
+        baseline.head(20000), prepared.head(20000), check_dtype=False, check_categorical=False
+    )
+
+    print(f"{'':12}{'time (s)':>12}{'memory (MB)':>14}")
+    print(f"{'baseline':12}{baseline_time:>12.2f}{baseline_mem:>14.1f}")
+    print(f"{'vectorized':12}{prepared_time:>12.2f}{prepared_mem:>14.1f}")
+    print(f"Speedup: {baseline_time / prepared_time:.1f}x | Memory: {baseline_mem / prepared_mem:.1f}x smaller")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from utils.db import COLUMN_MAPPING, DB_DATE_FORMAT
+
+STATUSES = ['Completed', 'Open', 'On Hold', 'In Progress', 'Cancelled']
+TYPES = ['Breakdown', 'Preventive', 'Corrective', 'Inspection']
+ACTIVITIES = [
+    'Replace worn bearing on conveyor drive',
+    'Rewire control panel after trip',
+    'Calibrate proximity sensor',
+    'Tighten loose coupling and realign shaft'
+]
+
+def synthetic_pm_data(rows, seed=0):
+    """ Build a synthetic PM_data table as returned by load_db """
+
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 24 * 60, rows), unit='min')
+    stop = start + pd.to_timedelta(rng.integers(10, 8 * 60, rows), unit='min')
+    start_text = start.strftime(DB_DATE_FORMAT)
+    stop_text = stop.strftime(DB_DATE_FORMAT)
+    staff = [f'Technician {i}' for i in range(40)] + ['Technician  0', None]
+
+    df = pd.DataFrame({
+        'ID': np.arange(1, rows + 1),
+        'Notification_date': start_text,
+        'Notify_by': rng.choice([f'Operator {i}' for i in range(60)], rows),
+        'Work_Order_Status': rng.choice(STATUSES, rows),
+        'Notification_type': rng.choice(TYPES, rows),
+        'StationList': rng.choice([f'Station {i}' for i in range(30)] + [None], rows),
+        'MachineList': rng.choice([f'Machine {i}' for i in range(150)] + [None], rows),
+        'EquipmentList': rng.choice([f'Equipment {i}' for i in range(600)], rows),
+        'Equipment_Group': rng.choice([f'Group {i}' for i in range(25)], rows),
+        'Equipment_Part': rng.choice([f'Part {i}' for i in range(80)] + [None], rows),
+        'Malfunction_Start_Date': start_text,
+        'Mulfunction_Stop_Date': stop_text,
+        'MTTR': np.round(rng.exponential(2.0, rows), 2),
+        'Breakdown_Type': rng.choice(['Mechanical', 'Electrical', 'Pneumatic'], rows),
+        'Problem_type': rng.choice([f'Problem {i}' for i in range(20)] + [None], rows),
+        'Problem_Cause': rng.choice([f'Cause {i} found during inspection' for i in range(300)], rows),
+        'Activity_Code': rng.choice([f'A{i:02d}' for i in range(12)], rows),
+        'Activity': rng.choice(ACTIVITIES, rows),
+        'Activity_by_1': rng.choice(np.array(staff, dtype=object), rows),
+        'Activity_Start_Date': start_text,
+        'Activity_Stop_Date': stop_text,
+        'Activity_Duration': np.round(rng.exponential(1.0, rows), 2),
+        'Breakdown_Hour': np.round(rng.exponential(1.0, rows), 2),
+        '__PowerAppsId__': [f'pa-{i}' for i in range(rows)],
+        'Modified': start.strftime('%d/%m/%Y %H:%M'),
+        'Modified_By': rng.choice([f'user{i}@example.com' for i in range(10)], rows),
+        'ActivityCount': rng.integers(1, 4, rows),
+        'Vendor_Name': rng.choice(['Vendor A', 'Vendor B', None], rows),
+        'Message': rng.choice([f'Line {i} stopped, please check' for i in range(500)], rows)
+    })
+    return df.rename(columns=COLUMN_MAPPING)
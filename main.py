@@ -1,6 +1,7 @@
 import streamlit as st
 from utils.db import init_db
-from utils.data import preprocess_data
+from utils.data import get_dataset
+from utils.filters import get_filter_options, reset_filters
 
 def main():
     st.logo("static/sdgrtest_logo.png",size="large")
@@ -8,9 +9,17 @@ def main():
     # Initiate and load data from database
     init_db()
     with st.spinner("Loading and processing data..."):
-        df = preprocess_data()
+        version, df = get_dataset()
+        filter_options = get_filter_options(version, df)
 
+    # Filters selected on another data version may not cover the new data
+    if st.session_state.get('dataset_version', version) != version:
+        reset_filters()
+
+    # Sessions hold a reference to the shared dataset, not a copy
     st.session_state.df = df
+    st.session_state.dataset_version = version
+    st.session_state.filter_options = filter_options
 
     # Define pages
     dashboard = st.Page(
@@ -1,6 +1,7 @@
 import streamlit as st
 from streamlit_calendar import calendar
 import pandas as pd
+from utils.events import window_events
 from utils.ui import hide_streamlit_css
 
 st.set_page_config(layout="wide")
@@ -15,57 +16,13 @@ if 'df' not in st.session_state:
     st.error("Data not found in session state. Please restart the dashboard.")
     st.stop()
 
-STATUS_COLORS = {
-    'Completed': '#2ca02c',
-    'Open': "#e7e41b",
-    'On Hold': '#ff7f0e',
-    'In Progress': '#9467bd',
-    'Cancelled': '#d62728'
-}
-
-@st.cache_data
-def prepare_calendar_events(data):
-    """Convert dataframe to calendar events"""
-    events = []
-    
-    if data.empty:
-        return events
-    
-    valid_data = data[data['Notification date'].notna()].copy()
-    
-    for idx, row in valid_data.iterrows():
-        try:
-            event_date = pd.to_datetime(row['Notification date'])
-            status = row.get('Work Order Status', 'Unknown')
-            color = STATUS_COLORS.get(status, '#808080')
-            
-            notification_type = row.get('Notification type', 'Work Order')
-            station = row.get('StationList', 'N/A')
-            
-            event = {
-                'title': f"{notification_type} - {station}",
-                'start': event_date.strftime('%Y-%m-%d'),
-                'end': event_date.strftime('%Y-%m-%d'),
-                'id': f"event_{idx}",
-                'backgroundColor': color,
-                'borderColor': color,
-            }
-            events.append(event)
-        except Exception:
-            continue
-    
-    return events
-
-calendar_events = prepare_calendar_events(st.session_state.df)
-
 CALENDAR_OPTIONS = {
     "editable": False,
     "selectable": True,
-    "navLinks": True,
     "headerToolbar": {
-        "left": "today prev,next",
+        "left": "",
         "center": "title",
-        "right": "dayGridMonth,timeGridWeek,listWeek"
+        "right": ""
     },
     "initialView": "dayGridMonth",
     "dayMaxEvents": 3,
@@ -77,6 +34,55 @@ CALENDAR_OPTIONS = {
     "moreLinkClick": "popover",
 }
 
+# Events are loaded for the visible month plus this margin on both sides
+WINDOW_MARGIN_DAYS = 14
+
+# Calendar views mapped to the labels of the view control
+CALENDAR_VIEWS = {
+    'dayGridMonth': 'Month',
+    'timeGridWeek': 'Week',
+    'listWeek': 'List'
+}
+
+# View and range are chosen in Streamlit, the component sends nothing back
+CALENDAR_CALLBACKS = []
+
+if 'calendar_date' not in st.session_state:
+    st.session_state.calendar_date = pd.Timestamp.today().normalize()
+
+def move_calendar(step):
+    """ Move the calendar one month or week forward or back, or to today with step 0 """
+
+    if step == 0:
+        st.session_state.calendar_date = pd.Timestamp.today().normalize()
+        return
+
+    offset = pd.DateOffset(months=1) if st.session_state.calendar_view == 'dayGridMonth' else pd.DateOffset(weeks=1)
+    st.session_state.calendar_date = st.session_state.calendar_date + step * offset
+
+def calendar_window():
+    """ First and last day of the event window around the current calendar date """
+
+    month_start = st.session_state.calendar_date.replace(day=1)
+    margin = pd.Timedelta(days=WINDOW_MARGIN_DAYS)
+    return (month_start - margin).date(), (month_start + pd.offsets.MonthEnd(0) + margin).date()
+
+def view_start():
+    """ First day of the range shown by the current calendar view """
+
+    date = st.session_state.calendar_date
+    if st.session_state.calendar_view == 'dayGridMonth':
+        return date.replace(day=1)
+
+    # FullCalendar weeks start on Sunday by default
+    return date - pd.Timedelta(days=(date.dayofweek + 1) % 7)
+
+def calendar_key(window):
+    """ Component key of a data version, view, visible range and event window """
+
+    return (f"calendar_{st.session_state.dataset_version}_{st.session_state.calendar_view}"
+            f"_{view_start().date()}_{window[0]}")
+
 CUSTOM_CSS = """
 /* Calendar Container - Auto Resize */
 .fc {
@@ -365,15 +371,43 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Render calendar
-if calendar_events:
-    calendar_key = f"calendar_{len(calendar_events)}"
-    
-    state = calendar(
-        events=calendar_events,
-        options=CALENDAR_OPTIONS,
-        custom_css=CUSTOM_CSS,
-        key=calendar_key
+# Navigation runs in Streamlit so the event window always follows the visible range
+navigation = st.columns([1, 1, 1, 6, 3])
+with navigation[0]:
+    st.button(":material/chevron_left:", on_click=move_calendar, args=(-1,), help="Previous", width='stretch')
+with navigation[1]:
+    st.button("Today", on_click=move_calendar, args=(0,), width='stretch')
+with navigation[2]:
+    st.button(":material/chevron_right:", on_click=move_calendar, args=(1,), help="Next", width='stretch')
+with navigation[4]:
+    st.segmented_control(
+        "View",
+        list(CALENDAR_VIEWS),
+        format_func=CALENDAR_VIEWS.get,
+        default=CALENDAR_OPTIONS['initialView'],
+        required=True,
+        key="calendar_view",
+        label_visibility="collapsed",
+        persist_state="session"
     )
-else:
-    st.info("No events to display.")
+
+window = calendar_window()
+events = window_events(st.session_state.df, *window, version=st.session_state.dataset_version)
+
+# Render calendar, a new visible range, window or view mounts a new component
+key = calendar_key(window)
+
+calendar(
+    events=events,
+    options={
+        **CALENDAR_OPTIONS,
+        "initialDate": st.session_state.calendar_date.strftime('%Y-%m-%d'),
+        "initialView": st.session_state.calendar_view
+    },
+    custom_css=CUSTOM_CSS,
+    callbacks=CALENDAR_CALLBACKS,
+    key=key
+)
+
+if not events:
+    st.info("No events in this period.")
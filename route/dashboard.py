@@ -1,10 +1,11 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 import streamlit_shadcn_ui as ui
-from utils.calc import calculate_kpi, calculate_delta, calculate_prev
-from utils.filters import create_filters, apply_filters
-from utils.db import total_record
+from utils.calc import calculate_rollup_kpi, calculate_period_kpi, calculate_delta, COMPARISON_MODES
+from utils.data import get_rollup
+from utils.filters import create_filters, selected_filters, apply_filters
+from utils.charts import (status_counts, status_by_type, trend_period, volume_trend, top_station_machines,
+                          staff_activity, chart_figure, MAX_STAFF)
 from utils.ui import hide_streamlit_css, metric_card_css, container_card_css, tabs_css
 
 st.set_page_config(layout="wide")
@@ -16,47 +17,81 @@ tabs_css()
 # st.markdown('<div style="font-size: 2rem; font-weight: bold; color: #333; margin-bottom: 1rem;">Overview</div>'
 #             , unsafe_allow_html=True)
 
-df = st.session_state.df
+# Hover date format of each trend bin
+TREND_HOVER_FORMATS = {'Week': '%Y-%m-%d', 'Month': '%b %Y'}
+
+# Fragments rendered by each dashboard tab, keyed for st.rerun
+TAB_FRAGMENTS = {
+    "Overview": ["kpi_cards", "status_distribution", "status_by_type", "weekly_trend"],
+    "Analytics": ["staff_activity"]
+}
+
+def rerun_fragments(*keys):
+    """ Rerun only the fragments among keys shown in the open tab, the rest of the page is kept """
+
+    shown = TAB_FRAGMENTS[st.session_state.get("dashboard_tab") or "Overview"]
+    targets = [key for key in keys if key in shown]
+    if targets:
+        st.rerun(targets)
+
+def rerun_charts():
+    """ Filters feed the KPI cards and every chart """
+
+    rerun_fragments(*TAB_FRAGMENTS["Overview"], *TAB_FRAGMENTS["Analytics"])
+
+def dashboard_filters():
+    """ Current sidebar filters, the date range defaults to the span of the matching data """
+
+    filters = selected_filters()
+    if not filters.get('date_range'):
+        filtered_rollup = apply_filters(rollup, filters, sorted_by_date=True, version=rollup_version)
+        valid_dates = filtered_rollup['Notification date'].dropna()
+        filters['date_range'] = (valid_dates.min().date(), valid_dates.max().date()) if not valid_dates.empty else None
+    return filters
+
+@st.fragment(key="filter_panel")
+def filter_panel():
+    """ Sidebar filters, a change reruns the fragments depending on it """
+
+    create_filters(df, filter_options, on_change=rerun_charts)
+    st.sidebar.selectbox("Compare with", list(COMPARISON_MODES), key="comparison",
+                         on_change=rerun_fragments, args=("kpi_cards",))
 
 if 'df' in st.session_state:
-    filters = create_filters(st.session_state.df)
-    filtered_df = apply_filters(st.session_state.df, filters)
-    st.session_state.filtered_df = filtered_df
+    df = st.session_state.df
+    filter_options = st.session_state.filter_options
+
+    # Charts and KPI cards are answered from the daily rollup instead of raw rows
+    rollup_version = ('rollup', st.session_state.dataset_version)
+    rollup = get_rollup(st.session_state.dataset_version)
 else:
     st.error("Data not found in session state. Please restart the dashboard.")
     st.stop()
 
-filtered_df = st.session_state.filtered_df
-
-if filtered_df.empty or total_record() == 0:
+# The shared dataset is loaded from the database, so it is empty when the database is
+if df.empty or rollup.empty:
     st.warning("Database not available. Please check the **Settings** page.")
     st.stop()
 
-current_kpi = calculate_kpi(filtered_df)
-
-if not filters.get('date_range'):
-    filtered_df_copy = filtered_df.copy()
-    filtered_df_copy['Notification date'] = pd.to_datetime(filtered_df_copy['Notification date'], errors='coerce')
-    valid_dates = filtered_df_copy['Notification date'].dropna()
-    
-    if not valid_dates.empty:
-        date_min = valid_dates.min().date()
-        date_max = valid_dates.max().date()
-        filters_with_date = filters.copy()
-        filters_with_date['date_range'] = (date_min, date_max)
-        
-        previous_df = calculate_prev(df, filters_with_date)
-    else:
-        previous_df = pd.DataFrame()
-else:
-    previous_df = calculate_prev(df, filters)
-    
-previous_kpi = calculate_kpi(previous_df) if not previous_df.empty else {}
-delta_kpi = calculate_delta(current_kpi, previous_kpi, as_percentage=True)
+filter_panel()
 
+@st.fragment(key="kpi_cards")
 def metric_cards():
     """ Display metric cards """
 
+    filters = dashboard_filters()
+    comparison = st.session_state.get("comparison") or next(iter(COMPARISON_MODES))
+    if filters['date_range']:
+        current_kpi, previous_kpi = calculate_period_kpi(
+            rollup, filters, COMPARISON_MODES[comparison], version=rollup_version
+        )
+        if previous_kpi['total_orders'] == 0:
+            previous_kpi = {}
+    else:
+        current_kpi, previous_kpi = calculate_rollup_kpi(rollup, filters), {}
+
+    delta_kpi = calculate_delta(current_kpi, previous_kpi, as_percentage=True)
+
     column = st.columns(4)
 
     with column[0]:
@@ -91,214 +126,203 @@ def metric_cards():
             help="Average activity duration"
         )
 
+@st.fragment(key="status_distribution")
 def workOrder_statusDist():
     """ Work Order status distribution pie chart """
 
-    if not filtered_df.empty:
-        status_counts = filtered_df['Work Order Status'].value_counts()
-        
-        fig_status_pie = px.pie(
-            values=status_counts.values,
-            names=status_counts.index,
-            title="Work Order Status Distribution",
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_status_pie.update_traces(
-            hovertemplate='<b>Status:</b> %{label}<br>' +
-            '<b>Count:</b> %{value}<br>' +
-            '<b>Percentage:</b> %{percent}<br>' +
-            '<extra></extra>', 
-            hoverlabel=dict(
-                bgcolor="#e6e6e6",
-                font_color="#000000",
-                bordercolor="#000000"
+    filters = dashboard_filters()
+    counts = status_counts(rollup, filters, version=rollup_version)
+    if not counts.empty:
+        def build():
+            fig_status_pie = px.pie(
+                values=counts.values,
+                names=counts.index,
+                title="Work Order Status Distribution",
+                color_discrete_sequence=px.colors.qualitative.Set3
             )
-        )
-        fig_status_pie.update_layout(
-            height=400, 
-            showlegend=True,
-            margin=dict(l=20, r=20, t=100, b=20),
-            legend=dict(orientation="v", yanchor="middle", y=1.1, xanchor="left", x=0.8, title=dict(text="Status")),
-            title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
-        )
-        st.plotly_chart(fig_status_pie, use_container_width=True)
+            fig_status_pie.update_traces(
+                hovertemplate='<b>Status:</b> %{label}<br>' +
+                '<b>Count:</b> %{value}<br>' +
+                '<b>Percentage:</b> %{percent}<br>' +
+                '<extra></extra>', 
+                hoverlabel=dict(
+                    bgcolor="#e6e6e6",
+                    font_color="#000000",
+                    bordercolor="#000000"
+                )
+            )
+            fig_status_pie.update_layout(
+                height=400, 
+                showlegend=True,
+                margin=dict(l=20, r=20, t=100, b=20),
+                legend=dict(orientation="v", yanchor="middle", y=1.1, xanchor="left", x=0.8, title=dict(text="Status")),
+                title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
+            )
+            return fig_status_pie
+
+        st.plotly_chart(chart_figure("status_distribution", filters, build, version=rollup_version), use_container_width=True)
     else:
         st.info("No data available")
 
+@st.fragment(key="status_by_type")
 def workOrder_status():  
     """ Work Order status by notification type stacked bar chart """
 
-    if not filtered_df.empty:
-        status_type_df = pd.crosstab(
-            filtered_df['Notification type'], 
-            filtered_df['Work Order Status'], 
-            margins=False
-        ).reset_index()
-        status_melted = status_type_df.melt(
-            id_vars=['Notification type'], 
-            var_name='Status', 
-            value_name='Count'
-        )
-        fig_status_bar = px.bar(
-            status_melted,
-            x='Notification type',
-            y='Count',
-            color='Status',
-            title="Work Order Status by Type",
-            labels={'Count': 'Number of Work Orders', 'Notification type': 'Type'},
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig_status_bar.update_traces(
-            hovertemplate='<b>Type:</b> %{x}<br>' +
-            '<b>Status:</b> %{fullData.name}<br>' +
-            '<b>Count:</b> %{y}<br>' +
-            '<extra></extra>',
-            hoverlabel=dict(
-                bgcolor="#e6e6e6",
-                font_color="#000000",
-                bordercolor="#000000"
+    filters = dashboard_filters()
+    status_melted = status_by_type(rollup, filters, version=rollup_version)
+    if not status_melted.empty:
+        def build():
+            fig_status_bar = px.bar(
+                status_melted,
+                x='Notification type',
+                y='Count',
+                color='Status',
+                title="Work Order Status by Type",
+                labels={'Count': 'Number of Work Orders', 'Notification type': 'Type'},
+                color_discrete_sequence=px.colors.qualitative.Pastel
             )
-        )
-        fig_status_bar.update_layout(
-            height=400,
-            xaxis_tickangle=-45,
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
-        )
-        st.plotly_chart(fig_status_bar, use_container_width=True)
+            fig_status_bar.update_traces(
+                hovertemplate='<b>Type:</b> %{x}<br>' +
+                '<b>Status:</b> %{fullData.name}<br>' +
+                '<b>Count:</b> %{y}<br>' +
+                '<extra></extra>',
+                hoverlabel=dict(
+                    bgcolor="#e6e6e6",
+                    font_color="#000000",
+                    bordercolor="#000000"
+                )
+            )
+            fig_status_bar.update_layout(
+                height=400,
+                xaxis_tickangle=-45,
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+                title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
+            )
+            return fig_status_bar
+
+        st.plotly_chart(chart_figure("status_by_type", filters, build, version=rollup_version), use_container_width=True)
     else:
         st.info("No data available")
 
+@st.fragment(key="weekly_trend")
 def workOrder_trend():
     """ Work Order volume trend over time """
 
-    weekly_df = filtered_df.copy()
-    weekly_df['Notification date'] = pd.to_datetime(weekly_df['Notification date'], errors='coerce')
-    weekly_df = weekly_df.dropna(subset=['Notification date'])
-
-    if not weekly_df.empty:
-        weekly_df['Week'] = weekly_df['Notification date'].dt.to_period('W').dt.start_time
-        
-        # Group by week and notification type
-        weekly_trend = weekly_df.groupby([
-            'Week', 
-            'Notification type'
-        ]).size().reset_index(name='Count')
-        
-        fig_weekly = px.bar(
-            weekly_trend, 
-            x='Week', 
-            y='Count', 
-            color='Notification type',
-            title="Work Order Volume Trend",
-            labels={'Count': 'Number of Work Orders', 'Week': 'Week'},
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
-        fig_weekly.update_traces(
-            hovertemplate='<b>Week:</b> %{x|%Y-%m-%d}<br>' +
-            '<b>Type:</b> %{fullData.name}<br>' +
-            '<b>Count:</b> %{y}<br>' +
-            '<extra></extra>',
-            hoverlabel=dict(
-                bgcolor="#e6e6e6",
-                font_color="#000000",
-                bordercolor="#000000"
+    filters = dashboard_filters()
+    period = trend_period(filters['date_range'])
+    trend = volume_trend(rollup, filters, period, version=rollup_version)
+
+    if not trend.empty:
+        def build():
+            fig_weekly = px.bar(
+                trend, 
+                x=period, 
+                y='Count', 
+                color='Notification type',
+                title=f"Work Order Volume Trend ({period}ly)",
+                labels={'Count': 'Number of Work Orders', period: period},
+                color_discrete_sequence=px.colors.qualitative.Set2
             )
-        )
-        fig_weekly.update_layout(
-            height=400, 
-            xaxis_tickangle=-45,
-            title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
-        )
-        st.plotly_chart(fig_weekly, use_container_width=True)
+            fig_weekly.update_traces(
+                hovertemplate=f'<b>{period}:</b> %{{x|{TREND_HOVER_FORMATS[period]}}}<br>' +
+                '<b>Type:</b> %{fullData.name}<br>' +
+                '<b>Count:</b> %{y}<br>' +
+                '<extra></extra>',
+                hoverlabel=dict(
+                    bgcolor="#e6e6e6",
+                    font_color="#000000",
+                    bordercolor="#000000"
+                )
+            )
+            fig_weekly.update_layout(
+                height=400, 
+                xaxis_tickangle=-45,
+                title={'x': 0, 'y': 1, 'yanchor': 'top', 'pad': {'t': 10, 'b': 20} }
+            )
+            return fig_weekly
+
+        st.plotly_chart(chart_figure("weekly_trend", filters, build, version=rollup_version), use_container_width=True)
     else:
-        st.info("No data available for weekly trend analysis")
+        st.info("No data available for trend analysis")
 
 
+@st.fragment(key="top_stations")
 def StationMachine_top():
     """ Top 10 Stations/Machines by work order volume """
 
-    if not filtered_df.empty:
-        station_machine_df = filtered_df.copy()
-        
-        station_machine_df['Station_Machine'] = (
-            station_machine_df['StationList'].fillna('Unknown') + 
-            ' - ' + 
-            station_machine_df['MachineList'].fillna('No Machine')
-        )
-        
-        top_stations = station_machine_df['Station_Machine'].value_counts().head(10).reset_index()
-        top_stations.columns = ['Station_Machine', 'Count']
-    
-        fig_stations = px.bar(
-            top_stations.sort_values('Count'),
-            x='Count',
-            y='Station_Machine',
-            orientation='h',
-            title="Top 10 Stations/Machines by Work Orders",
-            labels={'Count': 'Number of Work Orders', 'Station_Machine': 'Station - Machine'},
-            color='Count',
-            color_continuous_scale='Blues'
-        )
-        fig_stations.update_layout(
-            height=400,
-            showlegend=False,
-            yaxis={'categoryorder': 'total ascending'}
-        )
-        st.plotly_chart(fig_stations, use_container_width=True)
+    filters = dashboard_filters()
+    top_stations = top_station_machines(rollup, filters, version=rollup_version)
+
+    if not top_stations.empty:
+        def build():
+            fig_stations = px.bar(
+                top_stations.sort_values('Count'),
+                x='Count',
+                y='Station_Machine',
+                orientation='h',
+                title="Top 10 Stations/Machines by Work Orders",
+                labels={'Count': 'Number of Work Orders', 'Station_Machine': 'Station - Machine'},
+                color='Count',
+                color_continuous_scale='Blues'
+            )
+            fig_stations.update_layout(
+                height=400,
+                showlegend=False,
+                yaxis={'categoryorder': 'total ascending'}
+            )
+            return fig_stations
+
+        st.plotly_chart(chart_figure("top_stations", filters, build, version=rollup_version), use_container_width=True)
     else:
         st.info("No data available for station/machine analysis")
 
+@st.fragment(key="staff_activity")
 def staffActivity_types():
     """ Staff activity types """
     
-    if not filtered_df.empty:
-        staff_activity_df = pd.crosstab(
-            filtered_df['Activity by 1'],
-            filtered_df['Activity Code'],
-            margins=False
-        ).reset_index()
-        
-        staff_activity_melted = staff_activity_df.melt(
-            id_vars=['Activity by 1'],
-            var_name='Activity Type',
-            value_name='Count'
-        )
-        
-        staff_activity_melted = staff_activity_melted[staff_activity_melted['Count'] > 0]
-
-        fig_staff_activity = px.bar(
-            staff_activity_melted,
-            x='Activity by 1',
-            y='Count',
-            color='Activity Type',
-            title="Staff Activity Types Distribution",
-            labels={'Count': 'Number of Activities', 'Activity by 1': 'Staff Member'},
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig_staff_activity.update_layout(
-            height=600,
-            xaxis_tickangle=-45,
-            legend=dict(orientation="v", yanchor="middle", y=0.5)
-        )
-        st.plotly_chart(fig_staff_activity, use_container_width=True)
+    filters = dashboard_filters()
+    staff_activity_melted = staff_activity(rollup, filters, version=rollup_version)
+
+    if not staff_activity_melted.empty:
+        shown_staff = staff_activity_melted['Activity by 1'].nunique()
+        def build():
+            fig_staff_activity = px.bar(
+                staff_activity_melted,
+                x='Activity by 1',
+                y='Count',
+                color='Activity Type',
+                title=f"Staff Activity Types Distribution (top {MAX_STAFF} staff)" if shown_staff == MAX_STAFF else "Staff Activity Types Distribution",
+                labels={'Count': 'Number of Activities', 'Activity by 1': 'Staff Member'},
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+            fig_staff_activity.update_layout(
+                height=600,
+                xaxis_tickangle=-45,
+                legend=dict(orientation="v", yanchor="middle", y=0.5)
+            )
+            return fig_staff_activity
+
+        st.plotly_chart(chart_figure("staff_activity", filters, build, version=rollup_version), use_container_width=True)
     else:
         st.info("No data available for staff activity types analysis")
 
-tab1, tab2 = st.tabs(["Overview", "Analytics"], default="Overview")
+# Only the open tab is computed, switching tabs reruns the page
+tab1, tab2 = st.tabs(["Overview", "Analytics"], default="Overview", key="dashboard_tab", on_change="rerun")
 
-with tab1:
-    metric_cards()
-    column = st.columns([1, 1])
-    with column[0]:
-        with st.container(key="overview_card1"):
-            workOrder_statusDist()
-    with column[1]:
-        with st.container(key="overview_card2"):
-            workOrder_status()
-    with st.container(key="overview_card3"):
-        workOrder_trend()
-
-with tab2:
-    with st.container():
-        staffActivity_types()
\ No newline at end of file
+if tab1.open:
+    with tab1:
+        metric_cards()
+        column = st.columns([1, 1])
+        with column[0]:
+            with st.container(key="overview_card1"):
+                workOrder_statusDist()
+        with column[1]:
+            with st.container(key="overview_card2"):
+                workOrder_status()
+        with st.container(key="overview_card3"):
+            workOrder_trend()
+
+if tab2.open:
+    with tab2:
+        with st.container():
+            staffActivity_types()
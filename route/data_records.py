@@ -1,13 +1,21 @@
 import streamlit as st 
 import pandas as pd
+import numpy as np
+from utils.data import with_text, TEXT_COLUMNS
+from utils.filters import sort_positions
+from utils.db import search_db
+from utils.export import export_records, EXPORT_FORMATS
 from utils.ui import hide_streamlit_css
 
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
 st.set_page_config(layout="wide")
 hide_streamlit_css()
 st.markdown('<div style="font-size: 2rem; font-weight: bold; color: #333; margin-bottom: 1rem;">Data Records</div>'
             , unsafe_allow_html=True)
 
 df = st.session_state.df
+version = st.session_state.dataset_version
 
 col1, col2 = st.columns([6, 0.5])
 
@@ -15,7 +23,7 @@ with col1:
     search_term = st.text_input(
         "search_input",
         placeholder="Search by any field...",
-        help="Enter keywords to filter the table. Search is case-insensitive.",
+        help="Enter text to filter the table. The text must match the start of a word and continue as typed, use quotes for exact phrases. Search is case-insensitive.",
         label_visibility="collapsed",
         key="my_search"
     )
@@ -28,9 +36,25 @@ with col2:
         width='stretch'
     )
 
-display_df = df.copy()
+all_words = st.checkbox(
+    "Match words separately",
+    help="Every word must match the start of a word somewhere in the record, in any order",
+    key="records_all_words"
+)
+
+# Positions of the matching rows in the shared dataset, None when every row matches
+matches = None
+
+# Matching rowids come from the full-text index built at import time
+rowids = search_db(search_term, all_terms=all_words, at_version=version, version=version) if search_term else None
+
+if rowids is not None:
+    matches = df.index.get_indexer(rowids)
+    matches = matches[matches >= 0]
+elif search_term:
+    # Substring scan when the database has no full-text index
+    display_df = with_text(df, version)
 
-if search_term:
     search_columns = [
         'ID', 'Activity', 'StationList', 'MachineList', 'EquipmentList', 
         'Equipment Group', 'Equipment Part', 'Problem type', 'Problem Cause',
@@ -39,7 +63,7 @@ if search_term:
     ]
     
     # Create search mask
-    search_mask = pd.Series([False] * len(display_df))
+    search_mask = pd.Series(False, index=display_df.index)
     
     for col in search_columns:
         if col in display_df.columns:
@@ -49,10 +73,11 @@ if search_term:
             )
             search_mask = search_mask | col_mask
     
-    display_df = display_df[search_mask]
-    
+    matches = np.flatnonzero(search_mask.to_numpy())
+
+if search_term:
     # Show search results count
-    search_results = len(display_df)
+    search_results = len(matches)
     if search_results > 0:
         st.info(f"Found {search_results} records matching '{search_term}'")
     else:
@@ -85,11 +110,46 @@ table_columns = [
 ]
 
 # Filter columns that exist in dataframe
-available_columns = [col for col in table_columns if col in display_df.columns]
+available_columns = [col for col in table_columns if col in df.columns or col in TEXT_COLUMNS]
+row_count = len(df) if matches is None else len(matches)
+
+if row_count > 0:
+    sort_columns = [col for col in table_columns if col in df.columns]
+
+    controls = st.columns([3, 1, 1.2, 1])
+    with controls[0]:
+        sort_column = st.selectbox(
+            "Sort by",
+            sort_columns,
+            index=sort_columns.index('Notification date'),
+            key="records_sort"
+        )
+    with controls[1]:
+        sort_order = st.selectbox("Order", ["Descending", "Ascending"], key="records_order")
+    with controls[2]:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(100), key="records_page_size")
+    page_count = (row_count - 1) // page_size + 1
+
+    # Start over on a new search and keep the page in range when the result shrinks
+    if st.session_state.get('records_search') != (search_term, all_words):
+        st.session_state.records_search = (search_term, all_words)
+        st.session_state.records_page = 1
+    st.session_state.records_page = min(st.session_state.get('records_page', 1), page_count)
+    with controls[3]:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="records_page")
+
+    # The sort order is computed once per data version and column, only the visible page is sent
+    order = sort_positions(df, sort_column, sort_order == "Ascending", version=version)
+    if matches is not None:
+        selected = np.zeros(len(df), dtype=bool)
+        selected[matches] = True
+        order = order[selected[order]]
+
+    start = (page - 1) * page_size
+    page_df = with_text(df.take(order[start:start + page_size]), version)
 
-if not display_df.empty:
     st.dataframe(
-        display_df[available_columns],
+        page_df[available_columns],
         width='stretch',
         height=600,
         column_config={
@@ -131,14 +191,21 @@ if not display_df.empty:
         },
         hide_index=True
     )
+    st.caption(f"Rows {start + 1}-{min(start + page_size, row_count)} of {row_count} | Page {page} of {page_count}")
     
-    st.download_button(
-        label="Export to CSV",
-        data=display_df[available_columns].to_csv(index=False),
-        file_name=f"work_orders_filtered_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv",
-        help="Download the currently displayed data as CSV file"
-    )
+    export = st.columns([1, 1, 4], vertical_alignment="bottom")
+    with export[0]:
+        export_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="records_export_format")
+    extension, mime = EXPORT_FORMATS[export_format]
+    with export[1]:
+        # The file is only generated when the button is clicked
+        st.download_button(
+            label=f"Export to {export_format}",
+            data=lambda: export_records(df, version, order, available_columns, export_format),
+            file_name=f"work_orders_filtered_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=mime,
+            help="Download all matching records in the current sort order"
+        )
     
 else:
     st.warning("No records to display")
@@ -1,7 +1,9 @@
 import os
 import streamlit as st
 import pandas as pd
-from utils.db import init_db, append_db, total_record, load_db
+from utils.cache import cache_stats
+from utils.db import init_db, total_record
+from utils.jobs import start_import, job_status, active_imports, FINISHED_STATES
 from utils.ui import hide_streamlit_css
 
 st.set_page_config(layout="wide")
@@ -17,13 +19,48 @@ record_count = total_record()
 
 if record_count > 0:
     st.success(f"Database: {record_count} records ")
-    try:
-        df = load_db()
-    except Exception as e:
-        st.error(f"Error reading database: {str(e)}")
 
 st.subheader(":material/file_upload: Import Data (.csv)")
-st.markdown("**Note:** Uploading a new file will overwrite all existing data in the database")
+import_mode = st.radio(
+    "Import mode",
+    ["Replace all data", "Incremental update"],
+    horizontal=True,
+    help="Incremental update inserts new work orders and only rewrites rows whose Modified timestamp changed"
+)
+if import_mode == "Replace all data":
+    st.markdown("**Note:** Uploading a new file will overwrite all existing data in the database")
+else:
+    st.markdown("**Note:** Work orders are matched on `ID` (or `__PowerAppsId__`), existing rows not in the file are kept")
+
+@st.fragment(run_every=1)
+def import_progress():
+    """ Poll the session's background import, the page reruns when it finishes """
+
+    job = job_status(st.session_state.import_job)
+    if job is None or job['state'] in FINISHED_STATES:
+        st.session_state.import_result = job
+        del st.session_state.import_job
+        st.rerun()
+
+    st.progress(job['progress'], text=job['message'])
+
+if 'import_job' in st.session_state:
+    import_progress()
+
+if 'import_result' in st.session_state:
+    job = st.session_state.pop('import_result')
+    if job is None:
+        st.error("Import status was lost, please check the database records")
+    elif job['state'] == 'failed':
+        st.error(f"Error importing uploaded file: {job['error']}")
+    else:
+        result = job['result']
+        st.success(
+            f"Data uploaded successfully to database! Inserted: {result['inserted']} | "
+            f"Updated: {result['updated']} | Unchanged: {result['unchanged']}"
+        )
+        if result['skipped']:
+            st.warning(f"{result['skipped']} rows skipped (missing or duplicate work order key)")
 
 uploaded_file = st.file_uploader(
     "Choose CSV file",
@@ -31,26 +68,26 @@ uploaded_file = st.file_uploader(
     help="Select a CSV file to import into the database"
 )
 
+PREVIEW_ROWS = 5
+
 if uploaded_file is not None:
     try:
-        preview_df = pd.read_csv(uploaded_file)
+        # Only parse the first rows for the preview, the import streams the rest
+        preview_df = pd.read_csv(uploaded_file, nrows=PREVIEW_ROWS)
         st.subheader("Upload Preview")
-        st.info(f"Records: {len(preview_df)} | Columns: {len(preview_df.columns)}")
-        st.dataframe(preview_df.head(5), width='stretch')
+        st.info(f"File size: {uploaded_file.size / (1024 * 1024):.2f} MB | Columns: {len(preview_df.columns)}")
+        st.dataframe(preview_df, width='stretch')
         
-        if st.button("Confirm Upload & Save to Database"):
-            # Reset file pointer
-            uploaded_file.seek(0)
-
-            imported_df = pd.read_csv(uploaded_file)
-            append_db(imported_df)
-            st.success("Data uploaded successfully to database!")
-            
-            # Update session state with new data
-            new_df = load_db()
+        importing = 'import_job' in st.session_state
+        if active_imports() and not importing:
+            st.info("Another import is running, this one will start when it finishes")
 
-            st.session_state.df = new_df
-            st.cache_data.clear()
+        if st.button("Confirm Upload & Save to Database", disabled=importing):
+            # The import runs on the background worker, the page polls its progress
+            st.session_state.import_job = start_import(
+                uploaded_file,
+                incremental=import_mode == "Incremental update"
+            )
             st.rerun()
             
     except Exception as e:
@@ -60,3 +97,10 @@ DB_PATH = 'dashboard.db'
 if os.path.exists(DB_PATH):
     file_size = os.path.getsize(DB_PATH) / (1024 * 1024)
     st.markdown(f"**Database Path**: {DB_PATH} ({file_size:.2f} MB)")
+
+stats = cache_stats()
+st.markdown(
+    f"**Result Cache**: {stats['entries']} entries ({stats['bytes'] / (1024 * 1024):.2f} MB) | "
+    f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']:.1f}% | "
+    f"Evictions: {stats['evictions']}"
+)
@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+import streamlit as st
+import pandas as pd
+import numpy as np
+
+# Least recently used results are evicted beyond either limit
+RESULT_CACHE_ENTRIES = 128
+RESULT_CACHE_BYTES = 256 * 1024 * 1024
+
+@st.cache_resource
+def _result_cache():
+    """ Process-wide result cache and counters, shared by all sessions """
+
+    return {
+        'entries': OrderedDict(),
+        'bytes': 0,
+        'hits': 0,
+        'misses': 0,
+        'evictions': 0,
+        'lock': threading.Lock()
+    }
+
+def filter_key(filters):
+    """ Normalize dashboard filters into a hashable tuple
+
+    Selections containing 'All' and empty selections mean no filter, and the
+    order of selected values does not matter.
+    """
+
+    if not filters:
+        return ()
+
+    key = []
+    for name, value in sorted(filters.items()):
+        if name == 'date_range':
+            value = tuple(value) if value and len(value) == 2 and all(value) else None
+        elif isinstance(value, (list, tuple, set)):
+            value = None if not value or 'All' in value else tuple(sorted(map(str, value)))
+        elif value == 'All':
+            value = None
+        key.append((name, value))
+    return tuple(key)
+
+def _arg_key(value):
+    """ Hashable cache key of an argument, dataframes are identified by the version
+
+    Callables such as figure builders are left out, the other arguments must
+    identify their result.
+    """
+
+    if isinstance(value, dict):
+        return filter_key(value)
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)) or callable(value):
+        return None
+    return value
+
+def _result_size(value, inputs=()):
+    """ Approximate memory held by a cached result
+
+    Arguments returned as they are, e.g. an unfiltered frame, hold no memory
+    of their own and count as 0.
+    """
+
+    if any(value is item for item in inputs):
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(_result_size(item, inputs) for item in value)
+    return 0
+
+def versioned_cache(func):
+    """ Memoize a function on a version keyword plus its normalized arguments
+
+    version identifies the contents of the dataframe arguments, e.g. the data
+    version, so frames are never hashed. Calls without a version are not
+    cached. Cached results are shared by all sessions and must not be modified.
+    """
+
+    @wraps(func)
+    def wrapper(*args, version=None, **kwargs):
+        if version is None:
+            return func(*args, **kwargs)
+
+        key = (
+            func.__qualname__,
+            version,
+            tuple(_arg_key(arg) for arg in args),
+            tuple((name, _arg_key(value)) for name, value in sorted(kwargs.items()))
+        )
+        cache = _result_cache()
+        with cache['lock']:
+            if key in cache['entries']:
+                cache['entries'].move_to_end(key)
+                cache['hits'] += 1
+                return cache['entries'][key][0]
+            cache['misses'] += 1
+
+        result = func(*args, **kwargs)
+        size = _result_size(result, args + tuple(kwargs.values()))
+
+        with cache['lock']:
+            if key not in cache['entries']:
+                cache['entries'][key] = (result, size)
+                cache['bytes'] += size
+            while len(cache['entries']) > 1 and (
+                len(cache['entries']) > RESULT_CACHE_ENTRIES or cache['bytes'] > RESULT_CACHE_BYTES
+            ):
+                _, (_, evicted_size) = cache['entries'].popitem(last=False)
+                cache['bytes'] -= evicted_size
+                cache['evictions'] += 1
+        return result
+
+    return wrapper
+
+def _entry_version(key):
+    """ Data version of a cache key, versions may be tagged like ('rollup', 3) """
+
+    version = key[1]
+    return version[-1] if isinstance(version, tuple) else version
+
+def invalidate_results(current_version):
+    """ Drop cached results of every data version other than current_version """
+
+    cache = _result_cache()
+    with cache['lock']:
+        stale = [key for key in cache['entries'] if _entry_version(key) != current_version]
+        for key in stale:
+            cache['bytes'] -= cache['entries'].pop(key)[1]
+    return len(stale)
+
+def cache_stats():
+    """ Get entry count, memory and hit/miss counters of the result cache """
+
+    cache = _result_cache()
+    with cache['lock']:
+        lookups = cache['hits'] + cache['misses']
+        return {
+            'entries': len(cache['entries']),
+            'bytes': cache['bytes'],
+            'hits': cache['hits'],
+            'misses': cache['misses'],
+            'evictions': cache['evictions'],
+            'hit_rate': cache['hits'] / lookups * 100 if lookups else 0.0
+        }
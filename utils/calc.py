@@ -1,35 +1,47 @@
-import streamlit as st
 import pandas as pd
-from utils.filters import apply_filters
-
-@st.cache_data
-def calculate_kpi(df):
-    """ Calculate KPI from the dataframe """
-
-    if df.empty:
-        return {
-            'total_orders': 0,
-            'completed_orders': 0,
-            'completion_rate': 0,
-            'avg_mttr': 0,
-            'avg_duration': 0
-        }
-    
-    total_orders = len(df)
-    completed_orders = len(df[df['Work Order Status'] == 'Completed'])
-    completion_rate = (completed_orders / total_orders * 100) if total_orders > 0 else 0
+from utils.filters import filter_index
+from utils.cache import versioned_cache
+
+# Comparison periods for KPI deltas, labels mapped to previous_period modes
+COMPARISON_MODES = {
+    'Previous period': 'previous',
+    'Previous month': 'month',
+    'Same period last year': 'year'
+}
+
+def _kpi_from_sums(total_orders, completed_orders, mttr_sum, duration_sum):
+    """ Build KPI from aggregated sums """
 
-    avg_mttr = float(df['MTTR'].mean()) if not df['MTTR'].empty else 0.0
-    avg_duration = float(df['Activity Duration'].mean()) if not df['Activity Duration'].empty else 0.0
-    
     return {
         'total_orders': total_orders,
         'completed_orders': completed_orders,
-        'completion_rate': completion_rate,
-        'avg_mttr': avg_mttr,
-        'avg_duration': avg_duration
+        'completion_rate': (completed_orders / total_orders * 100) if total_orders > 0 else 0,
+        'avg_mttr': float(mttr_sum / total_orders) if total_orders > 0 else 0.0,
+        'avg_duration': float(duration_sum / total_orders) if total_orders > 0 else 0.0
     }
 
+def calculate_rollup_kpi(rollup, filters):
+    """ Calculate KPI from the daily rollup rows matching the filters """
+
+    rows = rollup.take(filter_index(rollup, filters, sorted_by_date=True))
+    completed = rows['Work Order Status'] == 'Completed'
+    return _kpi_from_sums(
+        int(rows['Orders'].sum()),
+        int(rows.loc[completed, 'Orders'].sum()),
+        rows['MTTR_sum'].sum(),
+        rows['Duration_sum'].sum()
+    )
+
+@versioned_cache
+def calculate_period_kpi(rollup, filters, mode='previous'):
+    """ Calculate KPI for the current date range and its comparison period
+
+    Both windows are binary-search slices of the date-sorted rollup, so the
+    comparison costs the same whatever the length of the range.
+    """
+
+    return calculate_rollup_kpi(rollup, filters), calculate_rollup_kpi(rollup, previous_period(filters, mode))
+
 def calculate_delta(current_kpi, previous_kpi, as_percentage=False):
     """ Calculate percentage difference between current and previous KPI """
 
@@ -52,39 +64,31 @@ def calculate_delta(current_kpi, previous_kpi, as_percentage=False):
     
     return delta
 
-def calculate_prev(df, filters=None):
-    """ Get previous dataframe based on current filters """
-    
-    # Create a copy of filters for the previous period
-    previous_filters = filters.copy() if filters else {}
-    
-    # Adjust date range to previous month
-    if filters and filters.get('date_range') and len(filters['date_range']) == 2:
-        # Get current date range
-        current_start = pd.Timestamp(filters['date_range'][0])
-        current_end = pd.Timestamp(filters['date_range'][1])
-        
-        # Calculate previous month range 
-        previous_start = current_start - pd.Timedelta(days=30)
-        previous_end = current_end - pd.Timedelta(days=30)
-        
-        # Update filters with previous date range
-        previous_filters['date_range'] = (previous_start.date(), previous_end.date())
-    elif not filters or filters.get('date_range') is None:
-
-        df_copy = df.copy()
-        df_copy['Notification date'] = pd.to_datetime(df_copy['Notification date'], errors='coerce')
-        
-        # Get the most recent date in the dataset
-        max_date = df_copy['Notification date'].max()
-        
-        # Calculate previous month range
-        if pd.notna(max_date):
-            previous_end = max_date - pd.Timedelta(days=30)
-            previous_start = previous_end - pd.Timedelta(days=30)
-            
-            # Update filters with previous date range
-            previous_filters['date_range'] = (previous_start.date(), previous_end.date())
-    
-    # Apply filters to get previous period data
-    return apply_filters(df, previous_filters)
\ No newline at end of file
+def previous_period(filters, mode='previous'):
+    """ Get filters for the comparison period of the current date range
+
+    'previous' is the window of the same length right before the range,
+    'month' and 'year' shift the range back by one calendar month or year.
+    A range ending on a month end compares with a range ending on a month end.
+    """
+
+    previous_filters = filters.copy()
+
+    current_start = pd.Timestamp(filters['date_range'][0])
+    current_end = pd.Timestamp(filters['date_range'][1])
+
+    if mode == 'previous':
+        length = current_end - current_start + pd.Timedelta(days=1)
+        previous_start = current_start - length
+        previous_end = current_end - length
+    elif mode in ('month', 'year'):
+        offset = pd.DateOffset(months=1) if mode == 'month' else pd.DateOffset(years=1)
+        previous_start = current_start - offset
+        previous_end = current_end - offset
+        if current_end.is_month_end:
+            previous_end += pd.offsets.MonthEnd(0)
+    else:
+        raise ValueError(f"Unknown comparison mode: {mode}")
+
+    previous_filters['date_range'] = (previous_start.date(), previous_end.date())
+    return previous_filters
@@ -0,0 +1,114 @@
+import plotly.io as pio
+from utils.cache import versioned_cache
+from utils.filters import filter_index
+
+# Trend bars are binned by month instead of week beyond this many weeks
+MAX_WEEKLY_BINS = 104
+
+# Staff shown in the activity chart, busiest first
+MAX_STAFF = 30
+
+TREND_PERIODS = {'Week': 'W', 'Month': 'M'}
+
+def _filtered(rollup, filters):
+    """ Daily rollup rows matching the filters """
+
+    return rollup.take(filter_index(rollup, filters, sorted_by_date=True))
+
+@versioned_cache
+def status_counts(rollup, filters):
+    """ Work orders per status, largest first """
+
+    rows = _filtered(rollup, filters)
+    return rows.groupby('Work Order Status', observed=True)['Orders'].sum().sort_values(ascending=False)
+
+@versioned_cache
+def status_by_type(rollup, filters):
+    """ Work orders per notification type and status, in long format """
+
+    rows = _filtered(rollup, filters)
+    status_type_df = rows.pivot_table(
+        index='Notification type',
+        columns='Work Order Status',
+        values='Orders',
+        aggfunc='sum',
+        fill_value=0,
+        observed=True
+    ).reset_index()
+    return status_type_df.melt(
+        id_vars=['Notification type'],
+        var_name='Status',
+        value_name='Count'
+    )
+
+def trend_period(date_range):
+    """ Trend bin for a date range, weeks unless that makes more than MAX_WEEKLY_BINS bars per type """
+
+    if date_range and (date_range[1] - date_range[0]).days > MAX_WEEKLY_BINS * 7:
+        return 'Month'
+    return 'Week'
+
+@versioned_cache
+def volume_trend(rollup, filters, period='Week'):
+    """ Work orders per period and notification type, the period column is named after it """
+
+    rows = _filtered(rollup, filters).dropna(subset=['Notification date'])
+    rows = rows.assign(**{period: rows['Notification date'].dt.to_period(TREND_PERIODS[period]).dt.start_time})
+
+    # Sum daily counts by period and notification type
+    return rows.groupby([
+        period,
+        'Notification type'
+    ], observed=True)['Orders'].sum().reset_index(name='Count')
+
+@versioned_cache
+def top_station_machines(rollup, filters, limit=10):
+    """ Station and machine pairs with the most work orders """
+
+    rows = _filtered(rollup, filters)
+    top_stations = rows.groupby(
+        ['StationList', 'MachineList'],
+        observed=True
+    )['Orders'].sum().nlargest(limit).reset_index()
+
+    top_stations['Station_Machine'] = (
+        top_stations['StationList'].astype(str) +
+        ' - ' +
+        top_stations['MachineList'].astype(str)
+    )
+    return top_stations[['Station_Machine', 'Orders']].set_axis(['Station_Machine', 'Count'], axis=1)
+
+@versioned_cache
+def staff_activity(rollup, filters, limit=MAX_STAFF):
+    """ Work orders per staff member and activity code of the busiest staff, in long format without zeros """
+
+    rows = _filtered(rollup, filters)
+    totals = rows.groupby('Activity by 1', observed=True)['Orders'].sum()
+    if len(totals) > limit:
+        rows = rows[rows['Activity by 1'].isin(totals.nlargest(limit).index)]
+    staff_activity_df = rows.pivot_table(
+        index='Activity by 1',
+        columns='Activity Code',
+        values='Orders',
+        aggfunc='sum',
+        fill_value=0,
+        observed=True
+    ).reset_index()
+
+    staff_activity_melted = staff_activity_df.melt(
+        id_vars=['Activity by 1'],
+        var_name='Activity Type',
+        value_name='Count'
+    )
+    return staff_activity_melted[staff_activity_melted['Count'] > 0]
+
+@versioned_cache
+def figure_json(chart_id, filters, build):
+    """ Serialized Plotly figure of a chart, build() only runs on a cache miss """
+
+    return pio.to_json(build(), validate=False)
+
+def chart_figure(chart_id, filters, build, version=None):
+    """ Plotly figure of a chart, rebuilt from the cached JSON instead of Plotly Express """
+
+    return pio.from_json(figure_json(chart_id, filters, build, version=version))
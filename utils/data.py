@@ -1,47 +1,273 @@
+import os
+import glob
+import threading
 import streamlit as st
 import pandas as pd
-from utils.db import load_db
-
-@st.cache_data
-def preprocess_data():
-    """ Load and preprocess data from database """
-    
-    df = load_db()
-    
-    if df.empty:
-        return df
-    
-    # Convert datetime
-    columns = [
-        'Notification date', 
-        'Malfunction Start Date', 
-        'Malfunction Stop Date',
-        'Activity Start Date',
-        'Activity Stop Date'
-        ]
-    df[columns] = df[columns].apply(pd.to_datetime, format='%d/%m/%Y %H:%M', errors='coerce')
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from utils.db import load_db, load_rollup, data_version, database_id, DB_PATH, SCHEMA_VERSION, TABLE_1
+from utils.filters import get_filter_options
+
+# Preprocessed data is cached on disk per data version, bump CACHE_FORMAT when _prepare changes
+CACHE_DIR = os.path.join(os.path.dirname(DB_PATH), 'cache')
+CACHE_FORMAT = 4
+
+# Columns kept in memory, free-text columns are loaded on demand with with_text
+DATASET_COLUMNS = [
+    'ID',
+    'Notification date',
+    'Notify by',
+    'Work Order Status',
+    'Notification type',
+    'StationList',
+    'MachineList',
+    'EquipmentList',
+    'Equipment Group',
+    'Equipment Part',
+    'Malfunction Start Date',
+    'Malfunction Stop Date',
+    'MTTR',
+    'Breakdown Type',
+    'Problem type',
+    'Activity Code',
+    'Activity by 1',
+    'Activity Start Date',
+    'Activity Stop Date',
+    'Activity Duration',
+    'Breakdown Hour',
+    'Modified',
+    'Modified By',
+    'ActivityCount',
+    'Vendor Name'
+]
+TEXT_COLUMNS = ['Activity', 'Problem Cause', 'Message']
+
+DATE_COLUMNS = [
+    'Notification date',
+    'Malfunction Start Date',
+    'Malfunction Stop Date',
+    'Activity Start Date',
+    'Activity Stop Date'
+]
+FILL_COLUMNS = [
+    'StationList',
+    'MachineList',
+    'Equipment Part',
+    'Problem type',
+    'Activity by 1'
+]
+NUMERIC_COLUMNS = [
+    'MTTR',
+    'Activity Duration',
+    'Breakdown Hour',
+    'ActivityCount'
+]
+INTEGER_COLUMNS = ['ID', 'ActivityCount']
+
+# Low-cardinality text columns stored as category dtype
+CATEGORY_COLUMNS = [
+    'Work Order Status',
+    'StationList',
+    'MachineList',
+    'EquipmentList',
+    'Equipment Group',
+    'Equipment Part',
+    'Notification type',
+    'Notify by',
+    'Breakdown Type',
+    'Activity Code',
+    'Activity by 1',
+    'Problem type',
+    'Vendor Name',
+    'Modified By'
+]
+
+def _normalize_whitespace(series):
+    """ Collapse whitespace in text values, evaluated once per distinct value """
+
+    uniques = series.unique()
+    return series.map(dict(zip(uniques, (' '.join(str(value).split()) for value in uniques))))
+
+def _parse_dates(values):
+    """ Parse a text column of dates into datetime64 values, invalid dates become NaT
+
+    Imports store dates in DB_DATE_FORMAT, which Arrow casts in a single pass.
+    Columns holding any other text go through the pandas ISO 8601 parser.
+    """
+
+    try:
+        return pc.cast(pa.array(values, from_pandas=True), pa.timestamp('us')).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pd.to_datetime(values, format='ISO8601', errors='coerce').to_numpy()
+
+def _prepare(df):
+    """ Convert types and fill missing values of loaded data """
+
+    for col in [col for col in DATE_COLUMNS if col in df.columns]:
+        df[col] = _parse_dates(df[col])
 
     # Fill missing values
-    columns = [
-        'StationList', 
-        'MachineList', 
-        'Equipment Part', 
-        'Problem type', 
-        'Activity by 1'
-        ]
+    columns = [col for col in FILL_COLUMNS if col in df.columns]
     df[columns] = df[columns].fillna('Unknown')
-    
+
     # Normalize whitespace in staff names to prevent duplicates
-    df['Activity by 1'] = df['Activity by 1'].astype(str).apply(lambda x: ' '.join(x.split()))
+    if 'Activity by 1' in df.columns:
+        df['Activity by 1'] = _normalize_whitespace(df['Activity by 1'])
+
+    for col in [col for col in CATEGORY_COLUMNS if col in df.columns]:
+        df[col] = df[col].astype('category')
 
-    # Convert numeric columns
-    num_columns = [
-        'MTTR', 
-        'Activity Duration', 
-        'Breakdown Hour', 
-        'ActivityCount'
-        ]
-    df[num_columns] = df[num_columns].apply(pd.to_numeric, errors='coerce').fillna(0)
+    # Convert numeric columns, downcast to the smallest type holding the values
+    for col in [col for col in NUMERIC_COLUMNS if col in df.columns]:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        df[col] = pd.to_numeric(df[col], downcast='integer' if col in INTEGER_COLUMNS else 'float')
+    if 'ID' in df.columns and pd.api.types.is_numeric_dtype(df['ID']):
+        df['ID'] = pd.to_numeric(df['ID'], downcast='integer')
 
     return df
 
+def _cache_path(version):
+    """ Get the cache file path for a data version of the current database file """
+
+    return os.path.join(
+        CACHE_DIR, f'{TABLE_1}_s{SCHEMA_VERSION}_f{CACHE_FORMAT}_d{database_id():x}_v{version}.feather'
+    )
+
+def _write_cache(df, path):
+    """ Write preprocessed data to the cache and remove stale cache files """
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    df.reset_index().to_feather(tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+    for stale_path in glob.glob(os.path.join(CACHE_DIR, f'{TABLE_1}_*.feather')):
+        if stale_path != path:
+            os.remove(stale_path)
+
+def _load_preprocessed(version):
+    """ Load preprocessed data for a data version from the cache or database
+
+    The cache file is memory-mapped, which only speeds up reading it. The
+    frame is converted into regular pandas memory like a frame loaded from
+    the database.
+    """
+
+    path = _cache_path(version)
+    if os.path.exists(path):
+        try:
+            # Uncompressed feather files are read straight from the mapped pages, no parsing or decompression
+            return feather.read_table(path, memory_map=True).to_pandas().set_index('rowid')
+        except (pa.ArrowException, KeyError):
+            # Unreadable or incompatible file, rebuild it from the database
+            os.remove(path)
+
+    df = load_db(DATASET_COLUMNS, at_version=version)
+
+    # The database has moved on to another version, its rows are not this version's
+    if df is None:
+        return pd.DataFrame()
+
+    if df.empty:
+        return df
+
+    # Keep rows sorted by notification date so date windows are contiguous
+    df = _prepare(df).sort_values('Notification date', kind='stable', na_position='last')
+    try:
+        _write_cache(df, path)
+    except Exception:
+        pass
+    return df
+
+@st.cache_resource
+def _shared_dataset():
+    """ Process-wide holder of the preprocessed dataset, shared by all sessions """
+
+    return {'dataset': (None, pd.DataFrame()), 'lock': threading.Lock()}
+
+def get_dataset(version=None):
+    """ Get the shared read-only dataset as a (version, dataframe) pair
+
+    The dataset is loaded once per data version and swapped in for every
+    session when the version changes. Rows are sorted by notification date
+    with missing dates last. Callers must not modify the frame.
+    """
+
+    version = data_version() if version is None else version
+    holder = _shared_dataset()
+    if holder['dataset'][0] != version:
+        # Keep serving the current version while another session loads the new one
+        if holder['lock'].acquire(blocking=holder['dataset'][0] is None):
+            try:
+                if holder['dataset'][0] != version:
+                    # Replace the pair in one assignment so readers never see a mixed state
+                    holder['dataset'] = (version, _load_preprocessed(version))
+            finally:
+                holder['lock'].release()
+    return holder['dataset']
+
+@st.cache_resource(max_entries=2)
+def get_rollup(version):
+    """ Get the daily rollup for a data version, sorted by day and shared by all sessions
+
+    Each row holds the work order count and MTTR/duration sums of one day and
+    combination of status, type, station, machine, staff and activity code.
+    """
+
+    df = load_rollup(at_version=version)
+
+    # Empty when the database has moved on to another version
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    return _prepare(df).sort_values('Notification date', kind='stable', na_position='last').reset_index(drop=True)
+
+def update_dataset(update):
+    """ Run a database update and swap in the dataset of the resulting version
+
+    The dataset lock is held throughout, so sessions keep the current version
+    instead of loading the new one themselves as soon as it is committed. The
+    rollup, filter options and free-text columns are loaded before the swap,
+    while the database is still at the new version. Returns the result of
+    update() and the new (version, dataframe) pair.
+    """
+
+    holder = _shared_dataset()
+    with holder['lock']:
+        result = update()
+        version = data_version()
+        if holder['dataset'][0] != version:
+            df = _load_preprocessed(version)
+            get_rollup(version)
+            get_filter_options(version, df)
+            for column in TEXT_COLUMNS:
+                _load_text(version, column)
+            holder['dataset'] = (version, df)
+    return result, holder['dataset']
+
+@st.cache_resource(max_entries=2 * len(TEXT_COLUMNS))
+def _load_text(version, column):
+    """ Load a free-text column for a data version, shared by all sessions
+
+    None when the database has moved on to another version, versions only
+    go up so the column can no longer be loaded for this one.
+    """
+
+    df = load_db([column], at_version=version)
+    return None if df is None or column not in df.columns else df[column]
+
+def with_text(df, version, columns=TEXT_COLUMNS):
+    """ Add lazily loaded free-text columns to a dataframe of a data version indexed by rowid
+
+    Text that can no longer be loaded for the version is left missing.
+    """
+
+    texts = {}
+    for col in columns:
+        if col not in df.columns:
+            text = _load_text(version, col)
+            texts[col] = pd.Series(None, index=df.index, dtype='str') if text is None else text.reindex(df.index)
+    return df.assign(**texts)
@@ -1,18 +1,215 @@
 import os
+import re
+import queue
+import secrets
+import threading
+from contextlib import contextmanager
 import streamlit as st
 import sqlite3
 import pandas as pd
+import numpy as np
+from utils.cache import versioned_cache
 
 DB_PATH = os.path.join('.', 'database', 'TESt_dashboard.db')
 TABLE_1 = 'PM_data'
+STAGING_TABLE = 'PM_staging'
+ROLLUP_DAYS_TABLE = 'PM_rollup_days'
+CHANGED_ROWS_TABLE = 'PM_changed_rows'
+META_TABLE = 'PM_meta'
+ROLLUP_TABLE = 'PM_rollup'
+SEARCH_TABLE = 'PM_search'
+CHUNK_SIZE = 20000
+UPSERT_KEYS = ['ID', '__PowerAppsId__']
+SCHEMA_VERSION = 4
+
+# Dates are stored as sortable 'YYYY-MM-DD HH:MM:SS' strings
+SOURCE_DATE_FORMAT = '%d/%m/%Y %H:%M'
+DB_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DATE_COLUMNS = [
+    'Notification_date',
+    'Malfunction_Start_Date',
+    'Mulfunction_Stop_Date',
+    'Activity_Start_Date',
+    'Activity_Stop_Date'
+]
+STAFF_COLUMN = 'Activity_by_1'
+INDEX_COLUMNS = [
+    'Notification_date',
+    'Work_Order_Status',
+    'StationList',
+    'Notification_type',
+    'Activity_by_1'
+]
+
+# Daily rollup of work orders by these columns, rebuilt whenever the data changes
+ROLLUP_COLUMNS = [
+    'Work_Order_Status',
+    'Notification_type',
+    'StationList',
+    'MachineList',
+    'Activity_by_1',
+    'Activity_Code'
+]
+
+# Columns in the full-text index of the Data Records search
+SEARCH_COLUMNS = [
+    'ID',
+    'Activity',
+    'StationList',
+    'MachineList',
+    'EquipmentList',
+    'Equipment_Group',
+    'Equipment_Part',
+    'Problem_type',
+    'Problem_Cause',
+    'Notify_by',
+    'Activity_by_1',
+    'Vendor_Name',
+    'Work_Order_Status',
+    'Notification_type',
+    'Breakdown_Type',
+    'Message'
+]
+
+# Database column names mapped back to the original CSV headers
+COLUMN_MAPPING = {
+    'Notification_date': 'Notification date',
+    'Notify_by': 'Notify by',
+    'Work_Order_Status': 'Work Order Status',
+    'Notification_type': 'Notification type',
+    'Equipment_Group': 'Equipment Group',
+    'Equipment_Part': 'Equipment Part',
+    'Problem_type': 'Problem type',
+    'Problem_Cause': 'Problem Cause',
+    'Activity_by_1': 'Activity by 1',
+    'Activity_Duration': 'Activity Duration',
+    'Activity_Code': 'Activity Code',
+    'Breakdown_Type': 'Breakdown Type',
+    'Breakdown_Hour': 'Breakdown Hour',
+    'Creator_Email': 'Creator Email',
+    'Modified_By': 'Modified By',
+    'Activity_by_Vendor': 'Activity by Vendor',
+    'Activity_by_3': 'Activity by 3',
+    'Activity_by_4': 'Activity by 4',
+    'Vendor_Name': 'Vendor Name',
+    'Plan_Date_Time_Start': 'Plan Date/Time Start',
+    'Plan_Date_Time_End': 'Plan Date/Time End',
+    'Item_Type': 'Item Type',
+    'LOTO_Date_Time_Start': 'LOTO Date_Time Start',
+    'LOTO_Date_Time_End': 'LOTO Date_Time End',
+    'Malfunction_Start_Date': 'Malfunction Start Date',
+    'Mulfunction_Stop_Date': 'Malfunction Stop Date',
+    'Activity_Start_Date': 'Activity Start Date',
+    'Activity_Stop_Date': 'Activity Stop Date'
+}
+
+# Connection settings, readers are pooled and all writes share one connection
+READ_POOL_SIZE = 8
+BUSY_TIMEOUT = 30
+CACHE_SIZE_KB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+@st.cache_resource
+def _connection_pool():
+    """ Process-wide read connection pool and writer connection, shared by all sessions and threads """
+
+    return {
+        'readers': queue.LifoQueue(),
+        'opened': 0,
+        'writer': None,
+        'lock': threading.Lock(),
+        'write_lock': threading.Lock()
+    }
+
+def _connect():
+    """ Open a connection with the tuned pragmas, usable from any thread but by one at a time """
+
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    # WAL makes commits durable at checkpoints, not after every transaction
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KB}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    return conn
+
+@contextmanager
+def read_connection():
+    """ Borrow a pooled read connection
+
+    Up to READ_POOL_SIZE connections are opened, further readers wait for one
+    to be returned. With WAL journaling readers see the last committed data
+    and are not blocked by a running import.
+    """
+
+    pool = _connection_pool()
+    try:
+        conn = pool['readers'].get_nowait()
+    except queue.Empty:
+        with pool['lock']:
+            opened = pool['opened'] < READ_POOL_SIZE
+            pool['opened'] += opened
+        if not opened:
+            conn = pool['readers'].get()
+        else:
+            try:
+                conn = _connect()
+            except:
+                # Give the slot back, or readers would wait for a connection that never comes
+                with pool['lock']:
+                    pool['opened'] -= 1
+                raise
+    try:
+        yield conn
+    finally:
+        # End any implicit transaction so the connection does not pin an old snapshot
+        conn.rollback()
+        pool['readers'].put(conn)
+
+@contextmanager
+def snapshot_connection(at_version=None):
+    """ Borrow a pooled read connection holding one read snapshot
+
+    Every query on the connection sees the same committed data. With
+    at_version, None is yielded instead when that data is at another data
+    version, so rows of a newer import are never read as an older version.
+    """
+
+    with read_connection() as conn:
+        conn.execute('BEGIN')
+        if at_version is not None and _read_meta(conn, 'data_version') != at_version:
+            yield None
+        else:
+            yield conn
+
+@contextmanager
+def write_connection():
+    """ Hold the single writer connection, committed on success and rolled back on error """
+
+    pool = _connection_pool()
+    with pool['write_lock']:
+        if pool['writer'] is None:
+            pool['writer'] = _connect()
+        conn = pool['writer']
+        try:
+            yield conn
+            conn.commit()
+        except:
+            conn.rollback()
+            raise
+
 @st.cache_resource
 def init_db():
     """ Initiate database and create tables """
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with write_connection() as conn:
+        _init_tables(conn.cursor())
+
+def _init_tables(cursor):
+    """ Create tables and indexes and migrate older schemas """
+
+    # The journal mode is stored in the database file, readers no longer wait for writers
+    cursor.execute('PRAGMA journal_mode = WAL')
     cursor.execute(f'''
         CREATE TABLE IF NOT EXISTS {TABLE_1} (
             ID INTEGER,
@@ -57,91 +254,490 @@ def init_db():
             Path TEXT
         )
     ''')
-    conn.commit()
-    conn.close()
 
-def append_db(df):
-    """ Append data to database """
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value INTEGER)')
+    # Random id of this database file, data versions restart at 1 in a new file
+    cursor.execute(
+        f"INSERT OR IGNORE INTO {META_TABLE} (key, value) VALUES ('database_id', ?)", (secrets.randbits(62),)
+    )
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            Notification_date TEXT,
+            {' TEXT, '.join(ROLLUP_COLUMNS)} TEXT,
+            Orders INTEGER,
+            MTTR_sum REAL,
+            Duration_sum REAL
+        )
+    ''')
+
+    _create_search_index(cursor)
+
+    schema_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if schema_version < SCHEMA_VERSION:
+        # Migrate databases created with dd/mm/YYYY dates or raw staff names
+        if schema_version < 2:
+            _migrate(cursor)
+        if schema_version < 3:
+            _build_rollup(cursor)
+        _build_search_index(cursor)
+        _bump_version(cursor)
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    # Lookup indexes for incremental imports and filters
+    for column in UPSERT_KEYS + INDEX_COLUMNS:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{TABLE_1}_{column.strip("_")} ON {TABLE_1} ({column})')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{ROLLUP_TABLE}_Notification_date ON {ROLLUP_TABLE} (Notification_date)')
+
+def _bump_version(cursor):
+    """ Increment the data version after the table contents change """
+
+    cursor.execute(f'''
+        INSERT INTO {META_TABLE} (key, value) VALUES ('data_version', 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+    ''')
+
+def _normalize_dates(series):
+    """ Convert source date strings to the database date format """
 
+    parsed = pd.to_datetime(series, format=SOURCE_DATE_FORMAT, errors='coerce')
+
+    # Fall back to ISO and then a flexible day-first parse for other values
+    for fallback in [{'format': 'ISO8601'}, {'format': 'mixed', 'dayfirst': True}]:
+        retry = parsed.isna() & series.notna()
+        if not retry.any():
+            break
+        parsed[retry] = pd.to_datetime(series[retry], errors='coerce', **fallback)
+    return parsed.dt.strftime(DB_DATE_FORMAT)
+
+def _normalize_chunk(chunk):
+    """ Normalize dates and staff names of a chunk with database column names """
+
+    for col in DATE_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = _normalize_dates(chunk[col])
+
+    # Normalize whitespace in staff names so SQL filters match exact names
+    if STAFF_COLUMN in chunk.columns:
+        staff = chunk[STAFF_COLUMN]
+        chunk[STAFF_COLUMN] = staff.where(staff.isna(), staff.astype(str).str.split().str.join(' '))
+    return chunk
+
+def _migrate(cursor):
+    """ Rewrite stored dates and staff names in the normalized format """
+
+    columns = DATE_COLUMNS + [STAFF_COLUMN]
+    df = pd.DataFrame(
+        cursor.execute(f'SELECT rowid, {", ".join(columns)} FROM {TABLE_1}').fetchall(),
+        columns=['rowid'] + columns
+    )
     if df.empty:
         return
-    
-    conn = sqlite3.connect(DB_PATH)
-    
-    # Rename columns to match database schema 
-    df_clean = df.copy()
-    df_clean.columns = [col.replace(' ', '_').replace('/', '_').replace('?', '') for col in df_clean.columns]
-    
-    # Replace data
-    cursor = conn.cursor()
-    cursor.execute(f'DELETE FROM {TABLE_1}')
-    conn.commit()
-    
-    df_clean.to_sql(TABLE_1, conn, if_exists='append', index=False)
-    conn.close()
 
-def load_db():
-    """ Load data from database """
+    df = _normalize_chunk(df)
+    assignments = ', '.join(f'{col} = ?' for col in columns)
+    rows = df[columns + ['rowid']].astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    cursor.executemany(f'UPDATE {TABLE_1} SET {assignments} WHERE rowid = ?', rows)
+
+def _rollup_select(source, where='', group=''):
+    """ Aggregate data rows into rollup rows, grouped by day and the rollup columns """
+
+    columns = ', '.join(ROLLUP_COLUMNS)
+    return f'''
+        SELECT
+            substr(t.Notification_date, 1, 10) || ' 00:00:00' AS Day,
+            {', '.join(f't.{col}' for col in ROLLUP_COLUMNS)},
+            COUNT(*),
+            SUM(COALESCE(CAST(t.MTTR AS REAL), 0)),
+            SUM(COALESCE(CAST(t.Activity_Duration AS REAL), 0))
+        FROM {source}
+        {where}
+        GROUP BY Day, {columns}
+    '''
+
+def _build_rollup(cursor):
+    """ Rebuild the daily rollup of work order counts and MTTR/duration sums
+
+    Missing or non-numeric MTTR and durations count as 0 like in preprocessing.
+    """
+
+    columns = ', '.join(ROLLUP_COLUMNS)
+    cursor.execute(f'DELETE FROM {ROLLUP_TABLE}')
+    cursor.execute(f'''
+        INSERT INTO {ROLLUP_TABLE} (Notification_date, {columns}, Orders, MTTR_sum, Duration_sum)
+        {_rollup_select(f'{TABLE_1} AS t')}
+        ORDER BY Day IS NULL, Day
+    ''')
+
+def _update_rollup_days(cursor):
+    """ Recompute the rollup rows of the days listed in the temp days table
+
+    Each day's data rows are read through the notification date index, so
+    the cost follows the number of changed days, not the table size.
+    """
+
+    columns = ', '.join(ROLLUP_COLUMNS)
+    days = f'temp.{ROLLUP_DAYS_TABLE}'
+    cursor.execute(f'DELETE FROM {ROLLUP_TABLE} WHERE Notification_date IN (SELECT Day FROM {days})')
+    null_day = cursor.execute(f'SELECT 1 FROM {days} WHERE Day IS NULL').fetchone()
+    if null_day:
+        cursor.execute(f'DELETE FROM {ROLLUP_TABLE} WHERE Notification_date IS NULL')
+
+    # Dates are 'YYYY-MM-DD HH:MM:SS' strings, a day is the range of its prefix
+    cursor.execute(f'''
+        INSERT INTO {ROLLUP_TABLE} (Notification_date, {columns}, Orders, MTTR_sum, Duration_sum)
+        {_rollup_select(
+            f"{days} AS d CROSS JOIN {TABLE_1} AS t",
+            "WHERE t.Notification_date >= substr(d.Day, 1, 10) AND t.Notification_date < substr(d.Day, 1, 10) || '~'"
+        )}
+    ''')
+    if null_day:
+        cursor.execute(f'''
+            INSERT INTO {ROLLUP_TABLE} (Notification_date, {columns}, Orders, MTTR_sum, Duration_sum)
+            {_rollup_select(f'{TABLE_1} AS t', 'WHERE t.Notification_date IS NULL')}
+        ''')
+
+def _create_search_index(cursor):
+    """ Create the full-text index of the searchable columns, if SQLite has FTS5 """
+
+    # The index reads its text from the data table instead of keeping a copy
+    try:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                {', '.join(SEARCH_COLUMNS)},
+                content='{TABLE_1}',
+                content_rowid='rowid'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        pass
+
+def _has_search_index(cursor):
+    """ Check whether the full-text index exists, it is missing without FTS5 """
+
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)).fetchone() is not None
+
+def _build_search_index(cursor):
+    """ Rebuild the full-text index from the data table """
+
+    if _has_search_index(cursor):
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES('rebuild')")
+
+def _unindex_changed_rows(cursor):
+    """ Remove the index entries of the rows in the temp changed rows table, before their text changes """
+
+    columns = ', '.join(SEARCH_COLUMNS)
+    cursor.execute(f'''
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns})
+        SELECT 'delete', rowid, {columns} FROM {TABLE_1}
+        WHERE rowid IN (SELECT id FROM temp.{CHANGED_ROWS_TABLE})
+    ''')
+
+def _index_changed_rows(cursor, last_rowid):
+    """ Index the rows in the temp changed rows table and the rows inserted after last_rowid """
+
+    columns = ', '.join(SEARCH_COLUMNS)
+    cursor.execute(f'''
+        INSERT INTO {SEARCH_TABLE}(rowid, {columns})
+        SELECT rowid, {columns} FROM {TABLE_1}
+        WHERE rowid IN (SELECT id FROM temp.{CHANGED_ROWS_TABLE}) OR rowid > ?
+    ''', (last_rowid,))
+
+def _rebuild_derived(cursor):
+    """ Rebuild the rollup and search index after the table contents change """
+
+    _build_rollup(cursor)
+    _build_search_index(cursor)
+
+def _db_columns(columns):
+    """ Convert CSV column names to database column names """
+
+    return [col.replace(' ', '_').replace('/', '_').replace('?', '') for col in columns]
+
+def _insert_chunk(cursor, chunk, table=TABLE_1):
+    """ Insert a dataframe chunk into a database table """
+
+    chunk = _normalize_chunk(chunk.set_axis(_db_columns(chunk.columns), axis=1))
+
+    columns = ', '.join(f'"{col}"' for col in chunk.columns)
+    placeholders = ', '.join('?' * len(chunk.columns))
+    rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+    cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+def _merge_staging(cursor, columns):
+    """ Upsert staged rows into the main table, skipping unchanged rows """
+
+    key = next((col for col in UPSERT_KEYS if col in columns), None)
+    if key is None:
+        raise ValueError(f"Incremental import requires one of the key columns: {', '.join(UPSERT_KEYS)}")
+
+    # Rows without a key cannot be matched, keep only the last row per key
+    cursor.execute(f'''
+        DELETE FROM temp.{STAGING_TABLE}
+        WHERE {key} IS NULL
+           OR rowid NOT IN (SELECT MAX(rowid) FROM temp.{STAGING_TABLE} GROUP BY {key})
+    ''')
+    skipped = cursor.rowcount
+
+    # Without a Modified column every matched row is treated as changed
+    changed = 't.Modified IS NOT s.Modified' if 'Modified' in columns else '1'
+    exists = f'SELECT 1 FROM {TABLE_1} AS t WHERE t.{key} = s.{key}'
+    inserted, updated, staged = cursor.execute(f'''
+        SELECT
+            COALESCE(SUM(NOT EXISTS ({exists})), 0),
+            COALESCE(SUM(EXISTS ({exists} AND {changed})), 0),
+            COUNT(*)
+        FROM temp.{STAGING_TABLE} AS s
+    ''').fetchone()
+
+    # Days of the changed rows before and after the merge, their rollup rows are recomputed
+    day = "substr({}.Notification_date, 1, 10) || ' 00:00:00'"
+    cursor.execute(f'DROP TABLE IF EXISTS temp.{ROLLUP_DAYS_TABLE}')
+    cursor.execute(f'''
+        CREATE TEMP TABLE {ROLLUP_DAYS_TABLE} AS
+        SELECT {day.format('t')} AS Day
+        FROM temp.{STAGING_TABLE} AS s JOIN {TABLE_1} AS t ON t.{key} = s.{key}
+        WHERE {changed}
+        UNION
+        SELECT {day.format('s')}
+        FROM temp.{STAGING_TABLE} AS s
+        WHERE NOT EXISTS ({exists}) OR EXISTS ({exists} AND {changed})
+    ''')
+
+    # The external content index needs the old text of changed rows to remove their entries
+    search = _has_search_index(cursor)
+    if search:
+        cursor.execute(f'DROP TABLE IF EXISTS temp.{CHANGED_ROWS_TABLE}')
+        cursor.execute(f'''
+            CREATE TEMP TABLE {CHANGED_ROWS_TABLE} AS
+            SELECT t.rowid AS id
+            FROM temp.{STAGING_TABLE} AS s JOIN {TABLE_1} AS t ON t.{key} = s.{key}
+            WHERE {changed}
+        ''')
+        _unindex_changed_rows(cursor)
+
+    # New rows get rowids above the current maximum
+    last_rowid = cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {TABLE_1}').fetchone()[0]
+
+    assignments = ', '.join(f'"{col}" = s."{col}"' for col in columns if col != key)
+    if assignments:
+        cursor.execute(f'''
+            UPDATE {TABLE_1} AS t SET {assignments}
+            FROM temp.{STAGING_TABLE} AS s
+            WHERE t.{key} = s.{key} AND {changed}
+        ''')
+
+    column_list = ', '.join(f'"{col}"' for col in columns)
+    cursor.execute(f'''
+        INSERT INTO {TABLE_1} ({column_list})
+        SELECT {column_list} FROM temp.{STAGING_TABLE} AS s
+        WHERE NOT EXISTS ({exists})
+    ''')
+
+    _update_rollup_days(cursor)
+    cursor.execute(f'DROP TABLE temp.{ROLLUP_DAYS_TABLE}')
+    if search:
+        _index_changed_rows(cursor, last_rowid)
+        cursor.execute(f'DROP TABLE temp.{CHANGED_ROWS_TABLE}')
+
+    return {
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': staged - inserted - updated,
+        'skipped': skipped
+    }
+
+def import_csv(file, incremental=False, chunksize=CHUNK_SIZE, progress=None):
+    """ Stream a CSV file into the database in chunks
+
+    Replaces all existing data by default. With incremental=True the rows are
+    upserted on the work order key and rows with an unchanged Modified
+    timestamp are skipped.
+    """
+
+    total_size = getattr(file, 'size', None)
+    if total_size is None and file.seekable():
+        position = file.tell()
+        total_size = file.seek(0, os.SEEK_END)
+        file.seek(position)
+    rows = 0
+    columns = []
+    with write_connection() as conn:
+        cursor = conn.cursor()
+        if incremental:
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{STAGING_TABLE}')
+            cursor.execute(f'CREATE TEMP TABLE {STAGING_TABLE} AS SELECT * FROM {TABLE_1} WHERE 0')
+            table = f'temp.{STAGING_TABLE}'
+        else:
+            cursor.execute(f'DELETE FROM {TABLE_1}')
+            table = TABLE_1
+
+        for chunk in pd.read_csv(file, chunksize=chunksize):
+            _insert_chunk(cursor, chunk, table)
+            columns = _db_columns(chunk.columns)
+            rows += len(chunk)
+            if progress and total_size:
+                progress(min(file.tell() / total_size, 1.0), rows)
+
+        result = {'inserted': rows, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        if incremental:
+            # The merge updates the rollup and search index for the changed rows only
+            if rows:
+                result = _merge_staging(cursor, columns)
+            cursor.execute(f'DROP TABLE temp.{STAGING_TABLE}')
+        else:
+            _rebuild_derived(cursor)
+
+        # Unchanged incremental imports keep the current version and its caches
+        if result['inserted'] or result['updated'] or not incremental:
+            _bump_version(cursor)
+
+    _checkpoint()
+    return result
+
+def _checkpoint():
+    """ Copy an import's pages from the WAL into the database and truncate the WAL file """
+
+    with write_connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+def _select_list(columns):
+    """ Build a select list for columns given in original format, keyed by rowid """
+
+    db_names = {name: column for column, name in COLUMN_MAPPING.items()}
+    return 'rowid, ' + (', '.join(f'"{db_names.get(col, col)}"' for col in columns) if columns else '*')
+
+def load_db(columns=None, at_version=None):
+    """ Load data from database, indexed by rowid
+
+    With at_version, None is returned when the database is at another version.
+    """
 
     if not os.path.exists(DB_PATH):
         return pd.DataFrame()
     
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        df = pd.read_sql_query(f'SELECT * FROM {TABLE_1}', conn)
-    except:
-        df = pd.DataFrame()
-    conn.close()
+    with snapshot_connection(at_version) as conn:
+        if conn is None:
+            return None
+        try:
+            df = pd.read_sql_query(f'SELECT {_select_list(columns)} FROM {TABLE_1}', conn, index_col='rowid')
+        except:
+            df = pd.DataFrame()
     
     if df.empty:
         return df
     
     # Rename columns back to original format 
-    column_mapping = {
-        'Notification_date': 'Notification date',
-        'Notify_by': 'Notify by',
-        'Work_Order_Status': 'Work Order Status',
-        'Notification_type': 'Notification type',
-        'Equipment_Part': 'Equipment Part',
-        'Problem_type': 'Problem type',
-        'Problem_Cause': 'Problem Cause',
-        'Activity_by_1': 'Activity by 1',
-        'Activity_Duration': 'Activity Duration',
-        'Activity_Code': 'Activity Code',
-        'Breakdown_Type': 'Breakdown Type',
-        'Breakdown_Hour': 'Breakdown Hour',
-        'Creator_Email': 'Creator Email',
-        'Modified_By': 'Modified By',
-        'Activity_by_Vendor': 'Activity by Vendor',
-        'Activity_by_3': 'Activity by 3',
-        'Activity_by_4': 'Activity by 4',
-        'Vendor_Name': 'Vendor Name',
-        'Plan_Date_Time_Start': 'Plan Date/Time Start',
-        'Plan_Date_Time_End': 'Plan Date/Time End',
-        'Item_Type': 'Item Type',
-        'LOTO_Date_Time_Start': 'LOTO Date_Time Start',
-        'LOTO_Date_Time_End': 'LOTO Date_Time End',
-        'Malfunction_Start_Date': 'Malfunction Start Date',
-        'Mulfunction_Stop_Date': 'Malfunction Stop Date',
-        'Activity_Start_Date': 'Activity Start Date',
-        'Activity_Stop_Date': 'Activity Stop Date'
-    }
-    
-    df = df.rename(columns=column_mapping)
+    df = df.rename(columns=COLUMN_MAPPING)
     return df
 
+def load_rollup(at_version=None):
+    """ Load the daily rollup table with columns in original format
+
+    With at_version, None is returned when the database is at another version.
+    """
+
+    if not os.path.exists(DB_PATH):
+        return pd.DataFrame()
+
+    with snapshot_connection(at_version) as conn:
+        if conn is None:
+            return None
+        try:
+            df = pd.read_sql_query(f'SELECT * FROM {ROLLUP_TABLE}', conn)
+        except:
+            df = pd.DataFrame()
+
+    return df.rename(columns=COLUMN_MAPPING)
+
+def _match_query(query, all_terms=False):
+    """ Build an FTS5 query from search input
+
+    Unquoted text matches as a phrase whose last word may be a prefix, text in
+    double quotes matches as an exact phrase. With all_terms=True every
+    unquoted word matches separately as a word prefix, in any column.
+    """
+
+    parts = []
+    for phrase, text in re.findall(r'"([^"]*)"|([^"]+)', query):
+        words = (phrase or text).split()
+        if not words:
+            continue
+        if phrase:
+            parts.append(f'"{" ".join(words)}"')
+        elif all_terms:
+            parts += [f'"{word}"*' for word in words]
+        else:
+            parts.append(f'"{" ".join(words)}"*')
+    return ' '.join(parts)
+
+def _search_rowids(conn, query, all_terms=False):
+    """ Run a full-text search on a connection and return the matching rowids """
+
+    cursor = conn.execute(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?', (_match_query(query, all_terms),)
+    )
+    return np.fromiter((row[0] for row in cursor), dtype=np.int64)
+
+@versioned_cache
+def search_db(query, all_terms=False, at_version=None):
+    """ Get rowids of records matching a search query, None if the index cannot answer it
+
+    Matching is case-insensitive. By default the text matches as a phrase
+    starting at a word, with all_terms=True every word must match the start
+    of a word in any searchable column. Quoted text always matches as a phrase.
+    With at_version the index cannot answer for another data version.
+    """
+
+    if not os.path.exists(DB_PATH) or not query.split():
+        return None
+
+    with snapshot_connection(at_version) as conn:
+        if conn is None:
+            return None
+        try:
+            rowids = _search_rowids(conn, query, all_terms)
+        except:
+            rowids = None
+    return rowids
+
 def total_record():
     """ Get total record count from database """
     
     if not os.path.exists(DB_PATH):
         return 0
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with read_connection() as conn:
+        try:
+            count = conn.execute(f'SELECT COUNT(*) FROM {TABLE_1}').fetchone()[0]
+        except:
+            count = 0
+    return count
+
+def _read_meta(conn, key):
+    """ Get an integer from the metadata table on a connection, 0 if missing """
+
     try:
-        cursor.execute(f'SELECT COUNT(*) FROM {TABLE_1}')
-        count = cursor.fetchone()[0]
+        row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = ?", (key,)).fetchone()
+        value = row[0] if row else 0
     except:
-        count = 0
-    conn.close()
-    return count
+        value = 0
+    return value
+
+def _meta_value(key):
+    """ Get an integer from the metadata table, 0 if missing """
+
+    if not os.path.exists(DB_PATH):
+        return 0
+
+    with read_connection() as conn:
+        return _read_meta(conn, key)
+
+def data_version():
+    """ Get the data version, incremented whenever the table contents change """
+
+    return _meta_value('data_version')
+
+def database_id():
+    """ Get the random id of the database file, versions are only comparable within one id """
+
+    return _meta_value('database_id')
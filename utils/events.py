@@ -0,0 +1,73 @@
+import pandas as pd
+from utils.cache import versioned_cache
+from utils.filters import date_bounds
+
+STATUS_COLORS = {
+    'Completed': '#2ca02c',
+    'Open': "#e7e41b",
+    'On Hold': '#ff7f0e',
+    'In Progress': '#9467bd',
+    'Cancelled': '#d62728'
+}
+DEFAULT_COLOR = '#808080'
+
+# Days with more work orders than this are shown as a single count event
+MAX_DAY_EVENTS = 20
+SUMMARY_COLOR = '#607d8b'
+
+def build_calendar_events(df):
+    """ Build one calendar event per work order with a notification date, column by column """
+
+    valid = df[df['Notification date'].notna()]
+
+    # Day strings straight from the datetime64 values instead of strftime per row
+    day = valid['Notification date'].to_numpy().astype('datetime64[D]').astype(str)
+    color = valid['Work Order Status'].astype(object).map(STATUS_COLORS).fillna(DEFAULT_COLOR).to_numpy()
+
+    return pd.DataFrame({
+        'title': (valid['Notification type'].astype(str) + ' - ' + valid['StationList'].astype(str)).to_numpy(),
+        'start': day,
+        'end': day,
+        'id': 'event_' + valid.index.astype(str),
+        'backgroundColor': color,
+        'borderColor': color
+    }, index=valid.index)
+
+def _records(events):
+    """ Convert an events frame to the component's list of dicts """
+
+    # Zipping plain column lists is much faster than DataFrame.to_dict('records')
+    columns = list(events.columns)
+    return [dict(zip(columns, values)) for values in zip(*(events[col].tolist() for col in columns))]
+
+def _summarize_dense_days(events):
+    """ Replace the events of days with more than MAX_DAY_EVENTS by one count event per day """
+
+    counts = events['start'].value_counts()
+    dense = counts[counts > MAX_DAY_EVENTS].sort_index()
+    if dense.empty:
+        return events
+
+    summary = pd.DataFrame({
+        'title': dense.astype(str).to_numpy() + ' work orders',
+        'start': dense.index,
+        'end': dense.index,
+        'id': 'day_' + dense.index,
+        'backgroundColor': SUMMARY_COLOR,
+        'borderColor': SUMMARY_COLOR
+    })
+    events = pd.concat([events[~events['start'].isin(dense.index)], summary], ignore_index=True)
+    return events.sort_values('start', kind='stable')
+
+@versioned_cache
+def window_events(df, start_date, end_date):
+    """ Get the calendar events between two dates of a dataframe sorted by notification date
+
+    The window is found by binary search, so only its rows are converted.
+    """
+
+    if df.empty:
+        return []
+
+    start, stop = date_bounds(df['Notification date'], (start_date, end_date))
+    return _records(_summarize_dense_days(build_calendar_events(df.iloc[start:stop])))
@@ -0,0 +1,47 @@
+import io
+import gzip
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.data import with_text
+
+# Rows converted per chunk, bounds the memory of the intermediate frames
+EXPORT_CHUNK_ROWS = 50000
+
+# Export formats mapped to file extension and MIME type
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+
+def _chunks(df, version, positions, columns):
+    """ Yield the exported rows in chunks with free-text columns attached, at least one chunk """
+
+    for start in range(0, max(len(positions), 1), EXPORT_CHUNK_ROWS):
+        yield with_text(df.take(positions[start:start + EXPORT_CHUNK_ROWS]), version)[columns]
+
+def export_records(df, version, positions, columns, export_format='CSV'):
+    """ Export the rows at positions of the dataset of a data version as file contents
+
+    Rows are converted and written chunk by chunk, so only the output is
+    held in full. Gzip and Parquet output is compressed as it is written.
+    """
+
+    buffer = io.BytesIO()
+
+    if export_format == 'Parquet':
+        writer = None
+        for chunk in _chunks(df, version, positions, columns):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(buffer, table.schema, compression='zstd')
+            writer.write_table(table)
+        writer.close()
+        return buffer.getvalue()
+
+    stream = gzip.GzipFile(fileobj=buffer, mode='wb') if export_format == 'CSV (gzip)' else buffer
+    for i, chunk in enumerate(_chunks(df, version, positions, columns)):
+        stream.write(chunk.to_csv(index=False, header=i == 0).encode('utf-8'))
+    if stream is not buffer:
+        stream.close()
+    return buffer.getvalue()
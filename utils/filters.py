@@ -1,8 +1,15 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
+from utils.cache import versioned_cache
 
-def create_filters(df):
-    """ Create sidebar filters """
+def create_filters(df, options=None, on_change=None):
+    """ Create sidebar filters, options come from get_filter_options when given
+
+    Widget values are kept in session state under FILTER_WIDGETS keys, so
+    selected_filters() can read them back without recreating the widgets.
+    on_change is called when any filter changes.
+    """
 
     if df.empty:
         return {
@@ -13,80 +20,196 @@ def create_filters(df):
             'staff': [],
         }
     
-    # Ensure proper data types
-    df = df.copy()
-    df['Notification date'] = pd.to_datetime(df['Notification date'], errors='coerce')
-    
-    valid_dates = df['Notification date'].dropna()
-    if not valid_dates.empty:
-        date_min = valid_dates.min().date()
-        date_max = valid_dates.max().date()
+    # Dates are already parsed by preprocessing, min and max skip missing values
+    dates = df['Notification date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce')
+
+    date_min = dates.min()
+    date_max = dates.max()
+    if pd.notna(date_min):
+        date_min = date_min.date()
+        date_max = date_max.date()
         
         col = st.sidebar.columns(2)
         with col[0]:
-            date_range1 = st.sidebar.date_input(
+            st.sidebar.date_input(
                 "Date Start",
                 value=date_min,
                 min_value=date_min,
+                key=FILTER_WIDGETS['date_start'],
+                on_change=on_change
             )
         with col[1]:
-            date_range2 = st.sidebar.date_input(
+            st.sidebar.date_input(
                 "Date End",
                 value=date_max,
-                max_value=date_max
+                max_value=date_max,
+                key=FILTER_WIDGETS['date_end'],
+                on_change=on_change
             )
-    else:
-        date_range = (None, None)
-
-    status_options = ['All'] + list(df['Work Order Status'].unique())
-    selected_status = st.sidebar.multiselect("Work Order Status", status_options, default=['All'])
-    station_options = ['All'] + list(df['StationList'].unique())
-    selected_stations = st.sidebar.multiselect("Station", station_options, default=['All'])
-    type_options = ['All'] + list(df['Notification type'].unique())
-    selected_types = st.sidebar.multiselect("Notification Type", type_options, default=['All'])
+
+    if options is None:
+        options = _filter_options(df)
+    st.sidebar.multiselect("Work Order Status", ['All'] + options['status'], default=['All'],
+                           key=FILTER_WIDGETS['status'], on_change=on_change)
+    st.sidebar.multiselect("Station", ['All'] + options['stations'], default=['All'],
+                           key=FILTER_WIDGETS['stations'], on_change=on_change)
+    st.sidebar.multiselect("Notification Type", ['All'] + options['types'], default=['All'],
+                           key=FILTER_WIDGETS['types'], on_change=on_change)
     
-    staff_options = ['All'] + list(df['Activity by 1'].unique())
-    selected_staff = st.sidebar.multiselect("Staff", staff_options, default=['All'])
+    st.sidebar.multiselect("Staff", ['All'] + options['staff'], default=['All'],
+                           key=FILTER_WIDGETS['staff'], on_change=on_change)
+
+    return selected_filters()
+
+# Filter keys mapped to the session state keys of their sidebar widgets
+FILTER_WIDGETS = {
+    'date_start': 'filter_date_start',
+    'date_end': 'filter_date_end',
+    'status': 'filter_status',
+    'stations': 'filter_stations',
+    'types': 'filter_types',
+    'staff': 'filter_staff'
+}
+
+def reset_filters():
+    """ Drop the sidebar filter values, the widgets start from their defaults on the next run
 
-    date_range = (date_range1, date_range2)
+    Keyed date inputs keep their value when their bounds change, so without
+    a reset the date range would leave out the rows of a newer import.
+    """
+
+    for key in FILTER_WIDGETS.values():
+        st.session_state.pop(key, None)
+
+def selected_filters():
+    """ Get the filters selected in the sidebar widgets from session state """
+
+    state = st.session_state
+    date_range1 = state.get(FILTER_WIDGETS['date_start'])
+    date_range2 = state.get(FILTER_WIDGETS['date_end'])
+
+    date_range = (date_range1, date_range2) if date_range1 and date_range2 else None
     return {
         'date_range': date_range,
-        'status': selected_status,
-        'stations': selected_stations,
-        'types': selected_types,
-        'staff': selected_staff,
+        'status': state.get(FILTER_WIDGETS['status'], ['All']),
+        'stations': state.get(FILTER_WIDGETS['stations'], ['All']),
+        'types': state.get(FILTER_WIDGETS['types'], ['All']),
+        'staff': state.get(FILTER_WIDGETS['staff'], ['All']),
     }
 
-@st.cache_data
-def apply_filters(df, filters):
-    """ Apply filters to dataframe """
+# Filter keys mapped to dataframe columns
+FILTER_COLUMNS = {
+    'status': 'Work Order Status',
+    'stations': 'StationList',
+    'types': 'Notification type',
+    'staff': 'Activity by 1'
+}
+
+def _code_table(categories, values):
+    """ Lookup table over category codes, the extra last slot catches missing values (-1) """
+
+    selected = np.zeros(len(categories) + 1, dtype=bool)
+    codes = categories.get_indexer(list(values))
+    selected[codes[codes >= 0]] = True
+    return selected
+
+def _isin(column, values):
+    """ Boolean mask of column values in a list, matched on codes for categoricals """
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return _code_table(column.cat.categories, values)[column.cat.codes.to_numpy()]
+    return column.isin(values).to_numpy()
+
+def _filter_options(df):
+    """ Values of each multiselect filter column in order of first appearance, missing values left out """
+
+    return {
+        key: list(df[column].dropna().unique()) if column in df.columns else []
+        for key, column in FILTER_COLUMNS.items()
+    }
+
+@st.cache_resource(max_entries=2)
+def get_filter_options(version, _df):
+    """ Options of the multiselect filters for a data version, shared by all sessions """
+
+    return _filter_options(_df)
+
+def _date_window(date_range):
+    """ Start and exclusive end timestamp of an inclusive date range """
+
+    return pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+
+def date_bounds(dates, date_range):
+    """ Row range of an inclusive date range in dates sorted ascending, by binary search """
+
+    values = dates.to_numpy()
+    start_date, end_date = _date_window(date_range)
+    bounds = np.searchsorted(values, np.array([start_date, end_date], dtype=values.dtype), side='left')
+    return int(bounds[0]), int(bounds[1])
+
+def filter_mask(df, filters):
+    """ Combine all active filters into one boolean mask, or None when nothing is filtered """
+
+    mask = None
+
+    # Date filter 
+    date_range = filters.get('date_range')
+    if date_range and len(date_range) == 2 and all(date_range):
+        dates = df['Notification date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, errors='coerce')
+
+        start_date, end_date = _date_window(date_range)
+
+        # Comparisons with missing dates are False, so only valid dates remain
+        dates = dates.to_numpy()
+        mask = (dates >= start_date.to_datetime64()) & (dates < end_date.to_datetime64())
+
+    for key, column in FILTER_COLUMNS.items():
+        values = filters.get(key)
+        if values and 'All' not in values:
+            column_mask = _isin(df[column], values)
+            mask = column_mask if mask is None else mask & column_mask
+
+    return mask
+
+def filter_index(df, filters, sorted_by_date=False):
+    """ Get positions of the rows matching the filters
+
+    With sorted_by_date the date range is resolved by binary search and the
+    other filters are only evaluated on the rows inside it.
+    """
+
+    date_range = filters.get('date_range')
+    if sorted_by_date and date_range and len(date_range) == 2 and all(date_range):
+        start, stop = date_bounds(df['Notification date'], date_range)
+        mask = filter_mask(df.iloc[start:stop], {**filters, 'date_range': None})
+        return np.arange(start, stop) if mask is None else start + np.flatnonzero(mask)
+
+    mask = filter_mask(df, filters)
+    return np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+
+@versioned_cache
+def apply_filters(df, filters, sorted_by_date=False):
+    """ Apply filters to dataframe, cached on the version keyword when given """
 
     if df.empty:
         return df
-        
-    filtered_df = df.copy()
-    
-    # Date filter 
-    if filters['date_range'] and len(filters['date_range']) == 2:
-        filtered_df['Notification date'] = pd.to_datetime(filtered_df['Notification date'], errors='coerce')
-        
-        start_date = pd.Timestamp(filters['date_range'][0])
-        end_date = pd.Timestamp(filters['date_range'][1]) + pd.Timedelta(days=1)
-        
-        # Filter only valid dates 
-        filtered_df = filtered_df[
-            (filtered_df['Notification date'].notna()) &
-            (filtered_df['Notification date'] >= start_date) & 
-            (filtered_df['Notification date'] < end_date)
-        ]
-    
-    if 'All' not in filters['status'] and filters['status']:
-        filtered_df = filtered_df[filtered_df['Work Order Status'].isin(filters['status'])]
-    if 'All' not in filters['stations'] and filters['stations']:
-        filtered_df = filtered_df[filtered_df['StationList'].isin(filters['stations'])]
-    if 'All' not in filters['types'] and filters['types']:
-        filtered_df = filtered_df[filtered_df['Notification type'].isin(filters['types'])]
-    if 'All' not in filters['staff'] and filters['staff']:
-        filtered_df = filtered_df[filtered_df['Activity by 1'].isin(filters['staff'])]
-
-    return filtered_df
+
+    if sorted_by_date:
+        positions = filter_index(df, filters, sorted_by_date=True)
+        return df if len(positions) == len(df) else df.take(positions)
+
+    mask = filter_mask(df, filters)
+
+    # Without active filters the original frame is returned as is
+    return df if mask is None else df[mask]
+
+@versioned_cache
+def sort_positions(df, column, ascending=True):
+    """ Row positions of the dataframe ordered by a column, missing values last """
+
+    values = df[column].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
@@ -0,0 +1,106 @@
+import os
+import uuid
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from utils.cache import invalidate_results
+from utils.data import update_dataset
+from utils.db import import_csv
+
+# Finished jobs kept for status queries, oldest are dropped first
+JOB_HISTORY = 20
+
+# Jobs go through 'queued', 'importing' and 'processing' and end in one of these states
+FINISHED_STATES = ('done', 'failed')
+
+@st.cache_resource
+def _import_worker():
+    """ Process-wide import worker and job table, shared by all sessions
+
+    A single thread runs the imports one after another, SQLite allows one
+    writer at a time.
+    """
+
+    return {
+        'executor': ThreadPoolExecutor(max_workers=1, thread_name_prefix='import'),
+        'jobs': OrderedDict(),
+        'lock': threading.Lock()
+    }
+
+def _update_job(job_id, **fields):
+    """ Update the fields of a job """
+
+    worker = _import_worker()
+    with worker['lock']:
+        worker['jobs'][job_id].update(fields)
+
+def _run_import(job_id, path, incremental):
+    """ Import a spooled CSV file, then build and swap in the new dataset version """
+
+    def progress(fraction, rows):
+        _update_job(job_id, progress=fraction, message=f"Read {rows} records...")
+
+    def update():
+        _update_job(job_id, state='importing', message="Importing records...")
+        with open(path, 'rb') as file:
+            result = import_csv(file, incremental=incremental, progress=progress)
+        _update_job(job_id, state='processing', progress=1.0, message="Processing imported data...")
+        return result
+
+    try:
+        result, (version, _) = update_dataset(update)
+
+        # Results are keyed on the data version, only older versions are dropped
+        invalidate_results(version)
+        _update_job(job_id, state='done', result=result, version=version, message="Import finished")
+    except Exception as e:
+        _update_job(job_id, state='failed', error=str(e), message="Import failed")
+    finally:
+        os.remove(path)
+
+def start_import(file, incremental=False):
+    """ Queue a CSV import on the background worker and return its job id
+
+    The file is spooled to a temporary file first, so the job does not depend
+    on the uploading session.
+    """
+
+    file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as spool:
+        shutil.copyfileobj(file, spool)
+
+    job_id = uuid.uuid4().hex
+    worker = _import_worker()
+    with worker['lock']:
+        worker['jobs'][job_id] = {
+            'state': 'queued',
+            'progress': 0.0,
+            'message': "Waiting for the import worker...",
+            'result': None,
+            'version': None,
+            'error': None
+        }
+        finished = [key for key, job in worker['jobs'].items() if job['state'] in FINISHED_STATES]
+        for key in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+            del worker['jobs'][key]
+
+    worker['executor'].submit(_run_import, job_id, spool.name, incremental)
+    return job_id
+
+def job_status(job_id):
+    """ Get a copy of a job's state, progress, message, result, version and error, None if unknown """
+
+    worker = _import_worker()
+    with worker['lock']:
+        job = worker['jobs'].get(job_id)
+        return dict(job) if job else None
+
+def active_imports():
+    """ Count the imports queued or running in any session """
+
+    worker = _import_worker()
+    with worker['lock']:
+        return sum(job['state'] not in FINISHED_STATES for job in worker['jobs'].values())